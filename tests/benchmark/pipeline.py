@@ -0,0 +1,271 @@
+# Benchmark of the task pipeline: tasks are run by Server.RunTask in-process against local http server
+# with synthetic pages, results are written into json file to compare runs across versions.
+#
+# python tests/benchmark/pipeline.py --browser fake --urls 200 --tasks 4 --output benchmark.json
+# python tests/benchmark/pipeline.py --browser chrome --urls 50 --tasks 1 --instance 2 --tabs 5 --pipeline
+#
+# Fake browser (see FakeDriver) loads pages over http without scripts, it measures server overhead.
+# Real browsers need their drivers and displays as usual, browser slots are taken from config (server.slots).
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Config sample is created if there is no config file.
+os.environ.setdefault("WEBCHELA_CONFIG_FILE", os.path.join(tempfile.gettempdir(), "webchela-benchmark.toml"))
+
+import psutil  # noqa: E402
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2  # noqa: E402
+import webchela.server.__main__ as server  # noqa: E402
+
+from webchela.core.vars import APP_VERSION  # noqa: E402
+
+SMALL_PAGE = "<html><head><title>small</title></head><body>{}</body></html>".format("<p>small page</p>" * 100)
+LARGE_PAGE = "<html><head><title>large</title></head><body>{}</body></html>".format(
+    "<div><p>large page</p><a href='/small'>link</a></div>" * 40000)
+HEAVY_JS_PAGE = """<html><head><title>heavy js</title></head><body><script>
+var started = Date.now();
+while (Date.now() - started < 500) {
+    var node = document.createElement("p");
+    node.textContent = Math.random().toString(36);
+    document.body.appendChild(node);
+    if (document.body.childNodes.length > 5000) document.body.innerHTML = "";
+}
+</script></body></html>"""
+
+# Page kinds are requested in turn.
+PAGES = ["small", "large", "slow", "redirect", "status/429", "status/503", "heavy-js"]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/small":
+            self.send_page(200, SMALL_PAGE)
+
+        elif url.path == "/large":
+            self.send_page(200, LARGE_PAGE)
+
+        elif url.path == "/slow":
+            time.sleep(float(query.get("delay", ["1"])[0]))
+            self.send_page(200, SMALL_PAGE)
+
+        elif url.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/small?" + url.query)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        elif url.path.startswith("/status/"):
+            code = int(url.path.split("/")[-1])
+            self.send_page(code, "<html><body>{}</body></html>".format(code), {"Retry-After": "1"})
+
+        elif url.path == "/heavy-js":
+            self.send_page(200, HEAVY_JS_PAGE)
+
+        else:
+            self.send_page(404, "<html><body>not found</body></html>")
+
+    def send_page(self, code, page, headers=None):
+        body = page.encode()
+
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class RssSampler:
+    # Peak memory of the server and its browsers (drivers, displays).
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def rss(self) -> int:
+        process = psutil.Process()
+        total = process.memory_info().rss
+
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+
+        return total
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, self.rss())
+            time.sleep(self.interval)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self) -> int:
+        self.running = False
+        self.thread.join()
+        return self.peak
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def make_task(args, base_url, task_index) -> webchela_pb2.Task:
+    task = webchela_pb2.Task(
+        client_id="benchmark-{}".format(task_index),
+        urls=["{}/{}?task={}&n={}".format(base_url, PAGES[n % len(PAGES)], task_index, n)
+              for n in range(args.urls)],
+        tab_pipeline=args.pipeline,
+        trace=True,
+    )
+
+    task.browser.type = args.browser
+    task.browser.instance = args.instance
+    task.browser.instance_tab = args.tabs
+
+    # benchmark measures the pipeline, not server load limits.
+    task.cpu_load = 100
+    task.mem_free = 1
+
+    return task
+
+
+def collect(chunks, stats):
+    # Results are counted by their last chunks, per-url latencies are taken from the task trace.
+    for chunk in chunks:
+        stats["bytes"] += len(chunk.chunk)
+
+        if chunk.end:
+            stats["results"] += 1
+
+        if chunk.trace:
+            for span in json.loads(chunk.trace)["spans"]:
+                if span["name"] == "url":
+                    stats["latencies"].append(span["duration"])
+                    code = str(span.get("status_code", 0))
+                    stats["status_codes"][code] = stats["status_codes"].get(code, 0) + 1
+
+
+def run_thread(args, tasks, stats):
+    # Each task holds its own thread like a grpc worker.
+    def run(task):
+        collect(server.Server().RunTask(task, None), stats)
+
+    threads = [threading.Thread(target=run, args=(task,)) for task in tasks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_asyncio(args, tasks, stats):
+    async def run(task):
+        chunks = []
+        async for chunk in server.AsyncServer().RunTask(task, None):
+            chunks.append(chunk)
+        collect(chunks, stats)
+
+    async def run_all():
+        await asyncio.gather(*[run(task) for task in tasks])
+
+    asyncio.run(run_all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the task pipeline.")
+    parser.add_argument("--browser", default="fake", choices=["chrome", "fake", "firefox"])
+    parser.add_argument("--fake-latency", default="0:0", help="fake browser page latency range, milliseconds")
+    parser.add_argument("--instance", default=2, type=int, help="browser instances per task")
+    parser.add_argument("--mode", default="thread", choices=["asyncio", "thread"], help="server mode")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--pipeline", action="store_true", help="open next url as soon as any tab is processed")
+    parser.add_argument("--tabs", default=5, type=int, help="tabs per browser instance")
+    parser.add_argument("--tasks", default=2, type=int, help="concurrent tasks")
+    parser.add_argument("--urls", default=70, type=int, help="urls per task")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger("webchela").setLevel(logging.WARNING)
+        logging.getLogger("seleniumwire").setLevel(logging.WARNING)
+
+    fixture = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    fixture.daemon_threads = True
+    threading.Thread(target=fixture.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:{}".format(fixture.server_address[1])
+
+    params = server.config.params
+    params.default.fake_fetch = True
+    params.default.fake_latency = args.fake_latency
+    params.default.fake_latency_min, params.default.fake_latency_max = map(int, args.fake_latency.split(":"))
+
+    tasks = [make_task(args, base_url, n) for n in range(args.tasks)]
+    stats = {"bytes": 0, "results": 0, "latencies": [], "status_codes": {}}
+
+    sampler = RssSampler()
+    sampler.start()
+    started = time.monotonic()
+
+    if args.mode == "asyncio":
+        run_asyncio(args, tasks, stats)
+    else:
+        run_thread(args, tasks, stats)
+
+    duration = time.monotonic() - started
+    rss_peak = sampler.stop()
+    fixture.shutdown()
+
+    report = {
+        "version": APP_VERSION,
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+        "params": vars(args),
+        "duration": round(duration, 3),
+        "urls": args.urls * args.tasks,
+        "results": stats["results"],
+        "urls_per_sec": round(stats["results"] / duration, 2) if duration else 0,
+        "latency_p50": round(percentile(stats["latencies"], 50), 4),
+        "latency_p99": round(percentile(stats["latencies"], 99), 4),
+        "rss_peak": rss_peak,
+        "bytes_streamed": stats["bytes"],
+        "status_codes": stats["status_codes"],
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webchela.core.block import BlockRules
+
+
+def test_block_rules():
+    rules = BlockRules(["image"], ["ads.example.com", "*://*/track/*"])
+
+    assert rules.match("https://example.com/logo.png", "image") == "type"
+    assert rules.match("https://example.com/logo.png?v=1") == "type"
+    assert rules.match("https://example.com/logo.png", "document") == ""
+    assert rules.match("https://cdn.ads.example.com/a.js", "script") == "url"
+    assert rules.match("https://example.com/track/pixel", "empty") == "url"
+    assert rules.match("https://example.com/app.js", "script") == ""
+
+    assert "*.png?*" in rules.url_patterns()
+    assert "*://*.ads.example.com/*" in rules.url_patterns()
+    assert not BlockRules([], [])
+
+
+def test_url_patterns_document():
+    rules = BlockRules(["image"], ["example.com", "*://*/track/*"])
+
+    # document of the tab isn't blocked by its own domain.
+    patterns = rules.url_patterns("https://www.example.com/track/index.html")
+    assert "*://*.example.com/*" not in patterns
+    assert "*://*/track/*" not in patterns
+    assert "*.png" in patterns
+
+    assert "*://*.example.com/*" in rules.url_patterns("https://other.com/")
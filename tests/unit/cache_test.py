@@ -0,0 +1,57 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import webchela.core.metrics as metrics
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.cache import ResultCache, result_key
+from webchela.core.config import Params
+from webchela.core.urls import UrlItem
+
+
+class Config:
+    def __init__(self, cache_size):
+        self.params = Params({
+            "default": {"browser_geometry": "1920x1080"},
+            "server": {"cache_size": cache_size}
+        })
+
+
+def test_result_key():
+    config = Config(1024)
+    request = webchela_pb2.Task()
+
+    key = result_key(config, request, UrlItem(0, "https://example.com", "", "", ""))
+    assert key == result_key(config, request, UrlItem(5, "https://example.com", "", "", ""))
+    assert key != result_key(config, request, UrlItem(0, "https://example.com", "", "", "return 1;"))
+
+    request.page_body_raw = True
+    assert key != result_key(config, request, UrlItem(0, "https://example.com", "", "", ""))
+
+    request.browser.type = "firefox"
+    assert key != result_key(config, request, UrlItem(0, "https://example.com", "", "", ""))
+
+
+def test_cache_lru():
+    result = webchela_pb2.Result(page_body="a" * 100, status_code=200)
+    cache = ResultCache(Config(result.ByteSize() * 2))
+
+    cache.put("a", result)
+    cache.put("b", result)
+    assert cache.get("a", 60) == result
+
+    cache.put("c", result)
+    assert cache.get("b", 60) is None
+    assert cache.get("a", 60) == result
+    assert cache.get("a", -1) is None
+
+    cache.put("d", webchela_pb2.Result(status_code=404))
+    assert cache.get("d", 60) is None
+
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+    assert "webchela_cache_size_bytes {}".format(result.ByteSize() * 2) in metrics.render()
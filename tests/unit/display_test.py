@@ -0,0 +1,58 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import webchela.core.display as display
+
+from webchela.core.config import Params
+
+
+class Config:
+    def __init__(self, size):
+        self.params = Params({
+            "default": {"browser_geometry": "10x10"},
+            "server": {"display_pool_size": size}
+        })
+
+
+class FakeDisplay:
+    def __init__(self, size):
+        self.size = size
+        self.alive = True
+        self.new_display_var = ":0"
+
+    def stop(self):
+        self.alive = False
+
+
+def test_display_pool(monkeypatch):
+    monkeypatch.setattr(display, "start_display", FakeDisplay)
+    monkeypatch.setattr(display, "display_healthy", lambda d: d.alive)
+
+    pool = display.DisplayPool(Config(1))
+    for _ in range(100):
+        if pool.idle:
+            break
+        time.sleep(0.01)
+
+    # started in background, reused after release.
+    first = pool.lease((10, 10))
+    assert pool.idle == [] and first.size == (10, 10)
+
+    # pool is busy, private display is stopped on release.
+    private = pool.lease((10, 10))
+    pool.release(private)
+    assert not private.alive
+
+    pool.release(first)
+    assert pool.lease((10, 10)) is first
+
+    # dead display is replaced.
+    pool.release(first)
+    first.alive = False
+    assert pool.lease((10, 10)) is not first
+    assert pool.started == 1
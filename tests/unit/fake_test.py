@@ -0,0 +1,37 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from selenium.common.exceptions import WebDriverException
+
+from webchela.core.fake import FakeDriver
+from webchela.core.vars import SCRIPT_NAVIGATION, SCRIPT_READY_STATE, SCRIPT_TAB_OPEN
+
+
+def test_fake_driver():
+    driver = FakeDriver(1024, 0, 0, 0, [404])
+
+    driver.execute_script(SCRIPT_TAB_OPEN, "https://example.com")
+    handle = (set(driver.window_handles) - {"blank"}).pop()
+    driver.switch_to.window(handle)
+
+    assert driver.execute_script(SCRIPT_READY_STATE) == ["complete", "https://example.com"]
+    assert driver.current_url == "https://example.com"
+    assert len(driver.page_source) == 1024
+    assert [r.response.status_code for r in driver.requests] == [404]
+    assert driver.execute_script(SCRIPT_NAVIGATION) == ["https://example.com", 404, "text/html"]
+
+    driver.quit()
+    with pytest.raises(WebDriverException):
+        driver.window_handles
+
+
+def test_fake_driver_failure():
+    driver = FakeDriver(1024, 0, 0, 1, [200])
+
+    with pytest.raises(WebDriverException):
+        driver.page_source
@@ -0,0 +1,145 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.cache import ResultCache
+from webchela.core.config import Params
+from webchela.core.flight import FlightRegistry
+from webchela.core.stream import ResultStream
+from webchela.core.urls import UrlQueue
+
+
+class Config:
+    def __init__(self):
+        self.params = Params({
+            "default": {"browser_geometry": "1920x1080"},
+            "server": {"cache_size": 0}
+        })
+
+
+class Task:
+    # Url queue and result stream of a task.
+    def __init__(self, flights, urls, ordered=True):
+        config = Config()
+
+        self.stream = ResultStream(ordered, 100)
+        self.queue = UrlQueue(config, webchela_pb2.Task(urls=urls), self.stream, ResultCache(config), flights)
+
+    def take(self, amount=10) -> list:
+        # Browser takes urls.
+        return self.queue.take(amount)
+
+    def load(self, items):
+        # Browser loads urls.
+        for item in items:
+            self.stream.put(item.index, webchela_pb2.Result(url=item.url, url_index=item.index, status_code=200))
+
+    def results(self) -> list:
+        return [(r.url_index, r.url) for r in self.stream.take()]
+
+
+def test_flight_land():
+    flights = FlightRegistry()
+
+    first = Task(flights, ["http://a", "http://b", "http://a"])
+    second = Task(flights, ["http://b"])
+
+    # duplicate within task follows the first url.
+    items = first.take()
+    assert [item.index for item in items] == [0, 1]
+    assert second.take() == []
+    assert (first.queue.waited(), second.queue.waited()) == (1, 1)
+
+    first.load(items)
+    assert first.results() == [(0, "http://a"), (1, "http://b"), (2, "http://a")]
+    assert second.results() == [(0, "http://b")]
+
+    assert (first.queue.waited(), second.queue.waited()) == (0, 0)
+    assert flights.flights == {}
+
+
+def test_flight_not_taken():
+    # Urls are followed only if they are being loaded, queued urls of other tasks don't hold them.
+    flights = FlightRegistry()
+
+    first = Task(flights, ["http://a", "http://b"])
+    second = Task(flights, ["http://b"])
+    assert [item.index for item in first.take(1)] == [0]
+
+    items = second.take()
+    assert [item.url for item in items] == ["http://b"]
+
+    # now first task follows the second one.
+    assert first.take() == []
+    second.load(items)
+    assert first.results() == []
+    assert second.results() == [(0, "http://b")]
+
+    first.queue.close()
+    assert flights.flights == {}
+
+
+def test_flight_abort():
+    # Leader is gone, the first active follower loads url.
+    flights = FlightRegistry()
+
+    leader = Task(flights, ["http://a"])
+    closed = Task(flights, ["http://a"])
+    follower = Task(flights, ["http://a"])
+
+    leader.take()
+    assert closed.take() == []
+    assert follower.take() == []
+
+    closed.queue.close()
+    leader.queue.close()
+    assert follower.queue.remaining() == 1
+    assert follower.queue.waited() == 0
+
+    # adopted url isn't followed, late follower follows the new leader.
+    late = Task(flights, ["http://a"])
+    items = follower.take()
+    assert late.take() == []
+
+    follower.load(items)
+    assert follower.results() == [(0, "http://a")]
+    assert late.results() == [(0, "http://a")]
+    assert closed.results() == []
+
+    assert flights.flights == {}
+
+
+def test_flight_failure():
+    # Failed url is skipped by followers, ordered stream doesn't wait for it.
+    flights = FlightRegistry()
+
+    leader = Task(flights, ["http://a"])
+    follower = Task(flights, ["http://a", "http://b"])
+
+    leader.take()
+    follower.load(follower.take())
+    assert follower.results() == []
+
+    leader.stream.skip(0)
+    assert follower.results() == [(1, "http://b")]
+    assert follower.queue.waited() == 0
+
+    assert flights.flights == {}
+
+
+def test_unordered_stream():
+    flights = FlightRegistry()
+
+    leader = Task(flights, ["http://a"])
+    follower = Task(flights, ["http://a", "http://b"], ordered=False)
+
+    items = leader.take()
+    follower.load(follower.take())
+    assert follower.results() == [(1, "http://b")]
+
+    leader.load(items)
+    assert follower.results() == [(0, "http://a")]
@@ -0,0 +1,52 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import io
+import pytest
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.config import Params
+from webchela.core.image import ScreenshotEncoder, encode_screenshot
+
+Image = pytest.importorskip("PIL.Image")
+
+
+class Config:
+    def __init__(self):
+        self.params = Params({"server": {"screenshot_workers": 1}})
+
+
+def test_encode_screenshot():
+    data = io.BytesIO()
+    Image.new("RGBA", (400, 2000), "white").save(data, "PNG")
+
+    encoded = encode_screenshot(data.getvalue(), "jpeg", 80, 100, 0)
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (100, 500)
+
+    assert encode_screenshot(data.getvalue(), "png", 80, 0, 0) == data.getvalue()
+
+
+def test_encode_async():
+    data = io.BytesIO()
+    Image.new("RGBA", (10, 10), "white").save(data, "PNG")
+
+    encoder = ScreenshotEncoder(Config())
+    request = webchela_pb2.Task(screenshot_format="webp", screenshot_quality=80)
+    result = webchela_pb2.Result(screenshots_binary=[data.getvalue(), b"broken"])
+
+    # broken screenshot, all screenshots are sent as captured.
+    encoded = asyncio.run(encoder.encode_async(request, "", result))
+    assert encoded.screenshot_format == "png"
+    assert list(encoded.screenshots_binary) == list(result.screenshots_binary)
+
+    del result.screenshots_binary[1:]
+    encoded = asyncio.run(encoder.encode_async(request, "", result))
+    with Image.open(io.BytesIO(encoded.screenshots_binary[0])) as image:
+        assert encoded.screenshot_format == image.format.lower() == "webp"
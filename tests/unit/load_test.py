@@ -0,0 +1,59 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+from webchela.core.config import Params
+from webchela.core.load import LoadSampler, get_score
+
+
+class Config:
+    def __init__(self, window):
+        self.params = Params({"server": {"load_interval": 1, "load_window": window}})
+
+
+class Memory:
+    def __init__(self, available):
+        self.available = available
+
+
+def sampler(monkeypatch, window, samples) -> LoadSampler:
+    # Samples (cpu load, free memory) are taken by hand, the first one is taken on start.
+    samples = iter(samples)
+    sample = [None]
+
+    def cpu_percent(interval):
+        sample[0] = next(samples)
+        return sample[0][0]
+
+    monkeypatch.setattr(psutil, "cpu_percent", cpu_percent)
+    monkeypatch.setattr(psutil, "virtual_memory", lambda: Memory(sample[0][1]))
+    monkeypatch.setattr(LoadSampler, "_run", lambda self: None)
+
+    return LoadSampler(Config(window))
+
+
+def test_load_window(monkeypatch):
+    load = sampler(monkeypatch, 3, [(10, 100), (20, 200), (30, 300), (60, 600)])
+    assert load.current().cpu_load == load.average().cpu_load == 10
+
+    for _ in range(3):
+        load._sample(0)
+
+    # current is the latest sample, average is taken over the window (the first sample is gone).
+    current = load.current()
+    assert (current.cpu_load, current.mem_free) == (60, 600)
+
+    average = load.average()
+    assert (average.cpu_load, average.mem_free) == (36, 366)
+    assert average.score == get_score(36, 366, load.cpu_count, load.cpu_freq)
+
+
+def test_load_zero(monkeypatch):
+    load = sampler(monkeypatch, 1, [(0, 1024 ** 3)])
+
+    assert load.current().cpu_load == 1
+    assert load.current().score == load.cpu_count * load.cpu_freq
@@ -0,0 +1,37 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webchela.core.metrics import Counter, Gauge, Histogram
+
+
+def test_counter():
+    counter = Counter("test_total", "Test.", ["browser", "client_id"])
+    counter.inc("chrome", 'a"b')
+    counter.inc("chrome", 'a"b', amount=2)
+
+    assert counter.render()[-1] == 'test_total{browser="chrome",client_id="a\\"b"} 3'
+
+
+def test_gauge():
+    gauge = Gauge("test_bytes", "Test.", [])
+    gauge.set(10)
+    gauge.set(5)
+
+    assert gauge.render() == ["# HELP test_bytes Test.", "# TYPE test_bytes gauge", "test_bytes 5"]
+
+
+def test_histogram():
+    histogram = Histogram("test_seconds", "Test.", ["phase"], buckets=(1, 5))
+    histogram.observe(0.5, "open")
+    histogram.observe(3, "open")
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{phase="open",le="1"} 1',
+        'test_seconds_bucket{phase="open",le="5"} 2',
+        'test_seconds_bucket{phase="open",le="+Inf"} 2',
+        'test_seconds_sum{phase="open"} 3.5',
+        'test_seconds_count{phase="open"} 2',
+    ]
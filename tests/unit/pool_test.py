@@ -0,0 +1,132 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.browser import FakeGenericBrowser
+from webchela.core.config import Params
+from webchela.core.fake import FakeRequest
+from webchela.core.pool import BrowserPool
+
+
+class Config:
+    def __init__(self, size_max, size_min=0, idle_timeout=300):
+        self.params = Params({
+            "default": {
+                "browser_geometry": "1920x1080",
+                "fake_failure_rate": 0,
+                "fake_fetch": False,
+                "fake_latency_max": 0,
+                "fake_latency_min": 0,
+                "fake_launch_delay": 0,
+                "fake_page_size": 1024,
+                "fake_status_codes": [200],
+                "tab_open_randomize": "0:0",
+            },
+            "server": {
+                "display_pool_size": 0,
+                "pool_idle_timeout": idle_timeout,
+                "pool_size_max": size_max,
+                "pool_size_min": size_min,
+            },
+        })
+
+
+def fake_task(geometry=""):
+    task = webchela_pb2.Task(client_id="test", page_timeout=10, script_timeout=10)
+    task.browser.type = "fake"
+    task.browser.headless = True
+    task.browser.geometry = geometry
+
+    return task
+
+
+def idle(pool) -> list:
+    return [browser for browsers in pool.idle.values() for browser, _ in browsers]
+
+
+def test_pool_reuse():
+    pool = BrowserPool(Config(2))
+    request = fake_task()
+
+    browser = pool.lease(request, "hash", None)
+    browser.capture(FakeRequest("http://a.test/", 200), FakeRequest("http://a.test/", 200).response)
+    assert browser.origins == {"http://a.test"}
+
+    # released browser is reset: no data of the previous task.
+    pool.release(browser)
+    assert idle(pool) == [browser]
+    assert browser.urls_data == {}
+    assert browser.origins == set()
+
+    assert pool.lease(fake_task(), "other", None) is browser
+    assert idle(pool) == []
+
+    # browsers of other settings aren't reused.
+    pool.release(browser)
+    other = pool.lease(fake_task("800x600"), "hash", None)
+    assert other is not browser
+    assert idle(pool) == [browser]
+
+
+def test_pool_eviction():
+    pool = BrowserPool(Config(1))
+
+    first = pool.lease(fake_task(), "hash", None)
+    second = pool.lease(fake_task(), "hash", None)
+
+    # the oldest idle browser gives way to a new one.
+    pool.release(first)
+    pool.release(second)
+    assert idle(pool) == [second]
+    assert not first.alive()
+
+
+def test_pool_not_poolable(monkeypatch):
+    monkeypatch.setattr(FakeGenericBrowser, "poolable", False)
+    pool = BrowserPool(Config(2))
+
+    browser = pool.lease(fake_task(), "hash", None)
+    pool.release(browser)
+    assert idle(pool) == []
+    assert not browser.alive()
+
+    # idle browsers aren't launched.
+    pool.size_min = 1
+    pool.maintain()
+    assert idle(pool) == []
+
+
+def test_pool_disabled():
+    pool = BrowserPool(Config(0))
+
+    browser = pool.lease(fake_task(), "hash", None)
+    pool.release(browser)
+    assert idle(pool) == []
+    assert not browser.alive()
+
+
+def test_pool_maintain():
+    pool = BrowserPool(Config(3, size_min=1, idle_timeout=0))
+
+    first = pool.lease(fake_task(), "hash", None)
+    second = pool.lease(fake_task(), "hash", None)
+    pool.release(first)
+    pool.release(second)
+
+    # expired browsers are closed, "pool_size_min" browsers are kept.
+    pool.maintain()
+    assert idle(pool) == [second]
+    assert not first.alive()
+
+    # browsers are launched for recently used settings.
+    assert pool.lease(fake_task(), "hash", None) is second
+    pool.maintain()
+
+    warm = idle(pool)
+    assert len(warm) == 1
+    assert warm[0] is not second and warm[0].alive()
+    assert warm[0].key == second.key
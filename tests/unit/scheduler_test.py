@@ -0,0 +1,192 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from threading import Event, Thread
+from time import monotonic, sleep
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.config import Params
+from webchela.core.load import Load
+from webchela.core.scheduler import Scheduler
+
+
+class Config:
+    def __init__(self, slots, client_slots=None, client_weight=None):
+        self.params = Params({"server": {
+            "slots": slots,
+            "client_slots": client_slots or {},
+            "client_weight": client_weight or {},
+        }})
+
+
+class StubSampler:
+    # Workload limits are reached until "ready" is set: jobs stay queued.
+    def __init__(self):
+        self.ready = Event()
+
+    def current(self):
+        return Load(0 if self.ready.is_set() else 100, 1, 0)
+
+
+class Jobs:
+    # Jobs record their start and run until "done" is set.
+    def __init__(self):
+        self.started = []
+        self.done = Event()
+
+    def run(self, name):
+        self.started.append(name)
+        self.done.wait(5)
+
+        return name
+
+    def submit(self, scheduler, client_id, name):
+        request = webchela_pb2.Task(client_id=client_id, cpu_load=50, mem_free=1)
+        return scheduler.submit(request, "hash", self.run, name)
+
+
+class Task:
+    # Task of batches: jobs take batches till the end unless other clients wait for slots (see BrowserPool.process),
+    # new jobs are queued while there are batches (see run_task).
+    def __init__(self, scheduler, client_id, batches, instance):
+        self.scheduler = scheduler
+        self.request = webchela_pb2.Task(client_id=client_id, cpu_load=50, mem_free=1)
+        self.batches = deque(range(batches))
+        self.instance = instance
+
+        self.done = Event()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def job(self):
+        processed = 0
+
+        while self.batches:
+            try:
+                self.batches.popleft()
+            except IndexError:
+                break
+
+            sleep(0.02)
+            processed += 1
+
+            if self.scheduler.contended(self.request.client_id):
+                break
+
+        return processed
+
+    def run(self):
+        jobs = set()
+
+        while self.batches or jobs:
+            while self.batches and len(jobs) < self.instance:
+                jobs.add(self.scheduler.submit(self.request, "hash", self.job))
+
+            finished, jobs = wait(jobs, timeout=5, return_when=FIRST_COMPLETED)
+
+        self.done.set()
+
+
+def wait_for(check, timeout=5):
+    deadline = monotonic() + timeout
+    while not check():
+        if monotonic() > deadline:
+            raise TimeoutError
+        sleep(0.01)
+
+
+def test_weighted_selection():
+    load = StubSampler()
+    jobs = Jobs()
+    scheduler = Scheduler(Config(3, client_weight={"a": 2}), load)
+
+    futures = [jobs.submit(scheduler, "b", "b1"), jobs.submit(scheduler, "b", "b2"),
+               jobs.submit(scheduler, "a", "a1"), jobs.submit(scheduler, "a", "a2")]
+    load.ready.set()
+
+    # "a" has twice the share of "b": b1 (oldest), a1, a2 (0.5 running per weight < 1).
+    wait_for(lambda: len(jobs.started) == 3)
+    sleep(0.1)
+    assert jobs.started == ["b1", "a1", "a2"]
+
+    jobs.done.set()
+    assert [f.result(5) for f in futures] == ["b1", "b2", "a1", "a2"]
+
+
+def test_client_slots():
+    load = StubSampler()
+    jobs = Jobs()
+    scheduler = Scheduler(Config(3, client_slots={"a": 1}), load)
+
+    futures = [jobs.submit(scheduler, "a", "a1"), jobs.submit(scheduler, "a", "a2"),
+               jobs.submit(scheduler, "b", "b1")]
+    load.ready.set()
+
+    wait_for(lambda: len(jobs.started) == 2)
+    sleep(0.1)
+    assert sorted(jobs.started) == ["a1", "b1"]
+    assert scheduler.stats()["queued"] == 1
+
+    jobs.done.set()
+    assert [f.result(5) for f in futures] == ["a1", "a2", "b1"]
+
+
+def test_cancelled_jobs():
+    load = StubSampler()
+    jobs = Jobs()
+    jobs.done.set()
+    scheduler = Scheduler(Config(1), load)
+
+    cancelled = jobs.submit(scheduler, "a", "a1")
+    future = jobs.submit(scheduler, "a", "a2")
+    assert cancelled.cancel()
+
+    load.ready.set()
+    assert future.result(5) == "a2"
+    assert jobs.started == ["a2"]
+
+    wait_for(lambda: scheduler.stats()["queued"] == 0)
+
+
+def test_slots_release():
+    load = StubSampler()
+    load.ready.set()
+    scheduler = Scheduler(Config(1), load)
+    request = webchela_pb2.Task(client_id="a", cpu_load=50, mem_free=1)
+
+    def fail():
+        raise RuntimeError("job error")
+
+    # failed job releases its slot, next job gets it.
+    with pytest.raises(RuntimeError):
+        scheduler.submit(request, "hash", fail).result(5)
+
+    assert scheduler.submit(request, "hash", lambda: "ok").result(5) == "ok"
+
+    wait_for(lambda: scheduler.stats()["running"] == 0)
+    assert scheduler.running == {}
+
+
+def test_contended():
+    load = StubSampler()
+    load.ready.set()
+    scheduler = Scheduler(Config(2), load)
+
+    # large task of "a" takes all slots, small task of "b" gets a slot after current batch of "a".
+    large = Task(scheduler, "a", 50, 2)
+    wait_for(lambda: scheduler.stats()["running"] == 2)
+
+    small = Task(scheduler, "b", 2, 2)
+    assert small.done.wait(5)
+    assert len(large.batches) > 20
+
+    assert large.done.wait(5)
+    assert not scheduler.contended("a")
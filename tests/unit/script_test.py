@@ -0,0 +1,79 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+import shutil
+import subprocess
+
+from webchela.core.vars import SCRIPT_PAGE_EVENT
+
+# Page scripts are run by node with stubs of page api: page was opened 10s ago, resource entries are finished
+# at given times (ms) relative to the start of waiting, buffered entries - before the start, observed - after it.
+PAGE = """
+const {performance: perf} = require("perf_hooks");
+const [script, event, wait, buffered, observed] = JSON.parse(process.argv[1]);
+const now = () => perf.now() + 10000;
+const started = now();
+
+let observers = [];
+globalThis.document = {readyState: "complete", addEventListener() {}};
+globalThis.window = {addEventListener() {}};
+globalThis.location = {href: "http://a.test/"};
+globalThis.performance = {
+    now: now,
+    getEntriesByType: () => buffered.map((end) => ({responseEnd: started + end})),
+};
+globalThis.PerformanceObserver = class {
+    constructor(callback) { this.records = []; observers.push(this); }
+    observe() {}
+    disconnect() { observers = observers.filter((o) => o !== this); }
+    takeRecords() { const records = this.records; this.records = []; return records; }
+};
+
+// new requests are finished while page is waited.
+observed.forEach((at) => setTimeout(() => {
+    observers.forEach((o) => o.records.push({responseEnd: now()}));
+}, at));
+
+new Function(script)(event, wait, (result) => {
+    console.log(JSON.stringify([result[0], Math.round(now() - started)]));
+    process.exit(0);
+});
+"""
+
+
+def page_event(event, wait, buffered, observed=()):
+    # [event is reached, waited ms].
+    if not shutil.which("node"):
+        pytest.skip("node isn't found")
+
+    args = json.dumps([SCRIPT_PAGE_EVENT, event, wait, buffered, list(observed)])
+    output = subprocess.run(["node", "-e", PAGE, args], capture_output=True, text=True, timeout=10)
+
+    return json.loads(output.stdout)
+
+
+def test_load_event():
+    assert page_event("load", 1000, [])[0]
+    assert page_event("domcontentloaded", 1000, [])[0]
+
+
+def test_networkidle():
+    # requests were finished long ago.
+    reached, waited = page_event("networkidle", 3000, [-9000] * 10)
+    assert reached and waited < 300
+
+    # buffer is full, requests might be dropped: idle time is counted from the start.
+    reached, waited = page_event("networkidle", 3000, [-9000] * 250)
+    assert reached and 500 <= waited < 800
+
+    # observed requests postpone idleness.
+    reached, waited = page_event("networkidle", 3000, [-9000] * 250, [300])
+    assert reached and 800 <= waited < 1100
+
+    reached, waited = page_event("networkidle", 600, [-100], [200, 400])
+    assert not reached and waited >= 600
@@ -0,0 +1,180 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+# Config sample is created if there is no config file.
+os.environ.setdefault("WEBCHELA_CONFIG_FILE", os.path.join(tempfile.gettempdir(), "webchela-test.toml"))
+
+import pytest
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+import webchela.server.__main__ as server
+
+from webchela.core.compression import decompress
+from webchela.core.stream import ResultStream
+from webchela.core.urls import UrlQueue
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    # Fake browser settings are read from config by every launched browser.
+    monkeypatch.setattr(server.config.params.default, "fake_failure_rate", 0)
+    monkeypatch.setattr(server.config.params.default, "fake_latency_min", 50)
+    monkeypatch.setattr(server.config.params.default, "fake_latency_max", 150)
+    monkeypatch.setattr(server.config.params.default, "fake_status_codes", [200])
+    monkeypatch.setattr(server.config.params.default, "tab_hop_delay", 0.05)
+
+    return server.config.params.default
+
+
+def fake_task(urls, **kwargs):
+    task = webchela_pb2.Task(client_id="test", urls=urls, cpu_load=100, mem_free=1, **kwargs)
+    task.browser.type = "fake"
+    task.browser.instance = 2
+    task.browser.instance_tab = 2
+
+    return task
+
+
+def run_task(task) -> list:
+    # Results in order of arrival.
+    results = []
+    data = b""
+
+    for chunk in server.Server().RunTask(task, None):
+        data += chunk.chunk
+
+        if chunk.end:
+            results.append(webchela_pb2.Result.FromString(decompress(data, chunk.compression)))
+            data = b""
+
+    return results
+
+
+def test_bool_defaults(monkeypatch):
+    # Client can turn off what is on by default, unset fields get server defaults.
+    for name in ["browser_headless", "page_body_raw", "stream_unordered", "tab_pipeline"]:
+        monkeypatch.setattr(server.config.params.default, name, True)
+
+    task = fake_task([])
+    server.prepare_task(task)
+    assert (task.browser.headless, task.page_body_raw, task.stream_unordered, task.tab_pipeline) == (True,) * 4
+
+    task = fake_task([], page_body_raw=False, stream_unordered=False, tab_pipeline=False)
+    task.browser.headless = False
+    server.prepare_task(task)
+    assert (task.browser.headless, task.page_body_raw, task.stream_unordered, task.tab_pipeline) == (False,) * 4
+
+
+def test_concurrent_tasks(fake):
+    # Duplicate urls within and between tasks are loaded once, every url index gets its own result.
+    urls = [
+        ["http://a.test/0", "http://a.test/1", "http://a.test/0", "http://a.test/2", "http://a.test/1"],
+        ["http://a.test/2", "http://a.test/0", "http://a.test/3", "http://a.test/0"],
+    ]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tasks = list(executor.map(run_task, [fake_task(u) for u in urls]))
+
+    for task_urls, results in zip(urls, tasks):
+        assert [r.url_index for r in results] == list(range(len(task_urls)))
+        assert [r.url for r in results] == task_urls
+        assert len({r.UUID for r in results}) == len(task_urls)
+        assert all(r.status_code == 200 for r in results)
+
+    assert server.flights.flights == {}
+
+
+def test_queued_urls(fake):
+    # Urls queued by other task (not being loaded) are loaded by the task itself.
+    urls = ["http://d.test/{}".format(i) for i in range(12)]
+
+    task = fake_task(urls)
+    task.browser.instance = 1
+    task.browser.instance_tab = 1
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(run_task, task)
+        sleep(0.2)
+
+        assert [r.url for r in run_task(fake_task(urls[-1:]))] == urls[-1:]
+        assert not leader.done()
+
+        assert len(leader.result()) == len(urls)
+
+
+def test_unordered_stream(fake):
+    urls = ["http://b.test/{}".format(i % 6) for i in range(12)]
+    results = run_task(fake_task(urls, stream_unordered=True))
+
+    assert sorted(r.url_index for r in results) == list(range(12))
+    assert all(r.url == urls[r.url_index] for r in results)
+
+
+def test_pipeline(fake):
+    urls = ["http://i.test/{}".format(i) for i in range(6)]
+    task = fake_task(urls, tab_pipeline=True)
+    task_hash = server.prepare_task(task)
+
+    stream = ResultStream(True, 100)
+    queue = UrlQueue(server.config, task, stream, server.result_cache, server.flights)
+    browser = server.browser_pool.lease(task, task_hash, stream)
+
+    try:
+        # Preempted browser processes tabs in flight, new urls aren't opened.
+        assert browser.pipeline(queue, lambda: True) == task.browser.instance_tab
+        assert [r.url for r in stream.take()] == urls[:2]
+
+        # Tabs are reopened until the queue is empty.
+        assert browser.pipeline(queue, lambda: False) == 4
+        assert [r.url for r in stream.take()] == urls[2:]
+    finally:
+        server.browser_pool.release(browser)
+
+    urls = ["http://j.test/{}".format(i) for i in range(6)]
+    assert [r.url for r in run_task(fake_task(urls, tab_pipeline=True))] == urls
+    assert server.flights.flights == {}
+
+
+def test_load_event(fake):
+    urls = ["http://h.test/0", "http://h.test/1"]
+
+    for event in ["domcontentloaded", "load", "networkidle"]:
+        assert [r.status_code for r in run_task(fake_task(urls, load_event=event))] == [200, 200]
+
+
+def test_compression_level(fake):
+    # Level out of method range is replaced by default level.
+    urls = ["http://e.test/0"]
+    results = run_task(fake_task(urls, compression="gzip", compression_level=50))
+
+    assert [r.url for r in results] == urls
+
+
+def test_native_network(fake):
+    # Status code is taken from navigation timing, it's 0 if browser doesn't expose it (firefox).
+    urls = ["http://f.test/0", "http://f.test/1"]
+
+    task = fake_task(urls)
+    task.browser.network = "native"
+    assert [r.status_code for r in run_task(task)] == [200, 200]
+
+    fake.fake_status_codes = [0]
+    task.urls[:] = ["http://g.test/0", "http://g.test/1"]
+    assert [(r.status_code, r.content_type) for r in run_task(task)] == [(0, "text/html")] * 2
+
+
+def test_failed_leader(fake):
+    # Followers don't get results of failed urls, task isn't stuck waiting for them.
+    fake.fake_failure_rate = 100
+
+    urls = ["http://c.test/0", "http://c.test/0", "http://c.test/1", "http://c.test/1"]
+    assert run_task(fake_task(urls, timeout=30)) == []
+    assert server.flights.flights == {}
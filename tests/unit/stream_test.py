@@ -0,0 +1,62 @@
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.compression import compress, decompress
+from webchela.core.stream import ResultStream, data_chunks
+
+
+def test_ordered_stream():
+    stream = ResultStream(True, 2)
+
+    stream.put(1, webchela_pb2.Result(url_index=1))
+    stream.put(2, webchela_pb2.Result(url_index=2))
+    assert stream.take() == []
+    assert stream.full()
+
+    stream.skip(0)
+    assert [r.url_index for r in stream.take()] == [1, 2]
+    assert not stream.full()
+
+
+def test_unordered_stream():
+    stream = ResultStream(False, 2)
+
+    stream.put(3, webchela_pb2.Result(url_index=3))
+    stream.put(0, webchela_pb2.Result(url_index=0))
+    assert [r.url_index for r in stream.take()] == [3, 0]
+
+
+def test_stream_close():
+    stream = ResultStream(True, 10)
+
+    stream.put(2, webchela_pb2.Result(url_index=2))
+    stream.put(1, webchela_pb2.Result(url_index=1))
+    assert [r.url_index for r in stream.close()] == [1, 2]
+
+    stream.put(0, webchela_pb2.Result(url_index=0))
+    assert stream.take() == []
+
+
+def test_data_chunks():
+    result = webchela_pb2.Result(page_body="a" * 100)
+    chunks = list(data_chunks(result.SerializeToString(), 30))
+
+    assert [c.end for c in chunks] == [False] * (len(chunks) - 1) + [True]
+    assert webchela_pb2.Result.FromString(b"".join(c.chunk for c in chunks)) == result
+
+    # small result is a single chunk.
+    assert [c.end for c in data_chunks(b"a", 30)] == [True]
+
+
+def test_data_chunks_compressed():
+    result = webchela_pb2.Result(page_body="a" * 1000)
+    data = compress(result.SerializeToString(), "gzip")
+    chunks = list(data_chunks(data, 10, "gzip"))
+
+    assert all(c.compression == "gzip" for c in chunks)
+    assert webchela_pb2.Result.FromString(decompress(b"".join(c.chunk for c in chunks), "gzip")) == result
@@ -4,10 +4,25 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from webchela.core.validate import is_bool
+from webchela.core.validate import is_bool, is_client_values, is_compression_level
 
 
 def test_is_bool():
     assert is_bool("test", True, False)
     assert not is_bool("test", "", False)
     assert not is_bool("test", "True", False)
+
+
+def test_is_client_values():
+    assert is_client_values("test", ["a:2", "b:c:1"], []) == {"a": 2, "b:c": 1}
+    assert is_client_values("test", ["a", "b:0"], []) == {}
+    assert is_client_values("test", "a:1", ["b:1"]) == {"b": 1}
+
+
+def test_is_compression_level():
+    assert is_compression_level("test", 9, "gzip", 0) == 9
+    assert is_compression_level("test", 22, "zstd", 0) == 22
+    assert is_compression_level("test", 50, "gzip", 0) == 0
+    assert is_compression_level("test", 22, "gzip", 0) == 0
+    assert is_compression_level("test", -1, "zstd", 0) == 0
+    assert is_compression_level("test", "9", "gzip", 0) == 0
@@ -0,0 +1,74 @@
+import fnmatch
+import re
+
+from urllib.parse import urlparse
+
+# Resource type -> request destinations (Sec-Fetch-Dest), url extensions (blocking by url only, see url_patterns).
+BLOCK_TYPES = {
+    "font": (["font"], ["eot", "otf", "ttf", "woff", "woff2"]),
+    "image": (["image"], ["avif", "bmp", "gif", "ico", "jpeg", "jpg", "png", "svg", "webp"]),
+    "media": (["audio", "track", "video"], ["m3u8", "mp3", "mp4", "ogg", "wav", "webm"]),
+    "script": (["script"], ["js"]),
+    "stylesheet": (["style"], ["css"]),
+}
+
+
+def url_extension(url) -> str:
+    path = urlparse(url).path
+    name = path.rsplit("/", 1)[-1]
+
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def wildcard_match(pattern, url) -> bool:
+    # "*" is the only special character (devtools Network.setBlockedURLs).
+    return re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), url) is not None
+
+
+class BlockRules:
+    # Requests blocked by task rules: resource types (Task.block_types) and urls (Task.block_urls).
+    # Url rule is a domain ("example.com" - domain and its subdomains) or a wildcard pattern of the whole url
+    # ("*://*/ads/*"). Documents (tabs) are never blocked. Browsers which block by url only skip patterns
+    # which match the document of the tab, other requests matching them aren't blocked in the tab then.
+
+    def __init__(self, types, urls):
+        self.dests = {dest: t for t in types for dest in BLOCK_TYPES[t][0]}
+        self.extensions = {ext: t for t in types for ext in BLOCK_TYPES[t][1]}
+
+        self.domains = [url.lower() for url in urls if "*" not in url and "/" not in url]
+        self.patterns = [url for url in urls if "*" in url or "/" in url]
+        self.regex = re.compile("|".join(fnmatch.translate(p) for p in self.patterns)) if self.patterns else None
+
+    def __bool__(self):
+        return bool(self.dests or self.domains or self.patterns)
+
+    def match(self, url, dest=None) -> str:
+        # Kind of rule ("type", "url") which blocks request, empty - request isn't blocked.
+        # Type is found by destination of request, by url extension if destination is unknown.
+        if dest == "document":
+            return ""
+
+        if dest in self.dests or (dest is None and url_extension(url) in self.extensions):
+            return "type"
+
+        host = (urlparse(url).hostname or "").lower()
+        if any(host == domain or host.endswith("." + domain) for domain in self.domains):
+            return "url"
+
+        if self.regex and self.regex.match(url):
+            return "url"
+
+        return ""
+
+    def url_patterns(self, document="") -> list:
+        # Wildcard patterns for browsers which block by url only (devtools Network.setBlockedURLs),
+        # patterns which match "document" (url of the tab) are skipped.
+        patterns = []
+
+        for ext in sorted(self.extensions):
+            patterns.extend(["*.{}".format(ext), "*.{}?*".format(ext)])
+
+        for domain in self.domains:
+            patterns.extend(["*://{}/*".format(domain), "*://*.{}/*".format(domain)])
+
+        return [p for p in patterns + self.patterns if not (document and wildcard_match(p, document))]
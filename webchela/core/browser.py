@@ -9,7 +9,7 @@ import logging
 import shutil
 import uuid
 
-from pyvirtualdisplay import Display
+from selenium import webdriver as native_webdriver
 from selenium.common.exceptions import (
     InvalidArgumentException,
     JavascriptException,
@@ -24,51 +24,98 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from seleniumwire import webdriver
 from tempfile import mkdtemp
-from time import sleep
+from time import monotonic, sleep
+from urllib.parse import urlparse
 
+import webchela.core.metrics as metrics
 import webchela.core.protobuf.webchela_pb2 as webchela_pb2
 
+from webchela.core.block import BlockRules
+from webchela.core.display import start_display
 from webchela.core.utils import get_timestamp, human_size
 from webchela.core.validate import is_browser_geometry, is_tab_open_randomize
 
-from webchela.core.vars import CHROME_CHROMEDRIVER_WRAPPER
+from webchela.core.fake import FakeDriver
+from webchela.core.vars import CHROME_CHROMEDRIVER_WRAPPER, DEFAULT_CAPTURE_STORAGE_SIZE
+from webchela.core.vars import DEFAULT_TAB_OPEN_DELAY, DEFAULT_TAB_OPEN_TRIES
 from webchela.core.vars import FIREFOX_GECKODRIVER_WRAPPER
+from webchela.core.vars import (
+    SCRIPT_LOCATION,
+    SCRIPT_NAVIGATION,
+    SCRIPT_PAGE_CAPTURE,
+    SCRIPT_PAGE_EVENT,
+    SCRIPT_PAGE_HEIGHT,
+    SCRIPT_PAGE_WIDTH,
+    SCRIPT_READY_STATE,
+    SCRIPT_RELOAD,
+    SCRIPT_SCROLL_INTO_VIEW,
+    SCRIPT_STOP,
+    SCRIPT_TAB_OPEN,
+)
 
 logger = logging.getLogger("webchela.server.browser")
 
 
-def chrome_grabber(config, request, task_hash, order, urls, cookies, screenshots, scripts):
-    b = ChromeGenericBrowser(config, request, task_hash, order)
-    return b.process(urls, cookies, screenshots, scripts)
+def browser_key(config, request):
+    _, x, y = is_browser_geometry("", request.browser.geometry, config.params.default.browser_geometry)
 
+    return (
+        request.browser.type,
+        tuple(request.browser.argument),
+        tuple(request.browser.extension),
+        tuple(request.block_types),
+        request.browser.headless,
+        request.browser.network,
+        request.browser.proxy,
+        x,
+        y
+    )
 
-def firefox_grabber(config, request, task_hash, order, urls, cookies, screenshots, scripts):
-    b = FirefoxGenericBrowser(config, request, task_hash, order)
-    return b.process(urls, cookies, screenshots, scripts)
 
+def url_origin(url) -> str:
+    return "{0.scheme}://{0.netloc}".format(urlparse(url))
 
-def update_urls(requests):
-    data = {}
 
-    for request in requests:
-        if request.response:
-            data[request.url] = (request.response.status_code,
-                                 request.response.headers['Content-Type'])
+class Tab:
+    # Browser tab with url and its loading state.
+    def __init__(self, item, handle):
+        self.item = item
+        self.handle = handle
 
-    return data
+        self.opened = monotonic()  # when tab was opened (metrics).
+        self.ready = False
+        self.retries = 0
+        self.state = "opened"  # verbose state.
+        self.timestamp = get_timestamp()  # when tab was opened/reloaded.
+        self.url_final = item.url  # final url (after all redirects).
 
 
 class GenericBrowser:
-    def __init__(self, config, request, task_hash, order):
+    # Browser can be reused by other tasks (see BrowserPool) if reset clears all site data of the previous task.
+    poolable = False
+
+    def __init__(self, config, request, task_hash, stream):
         self.config = config
         self.request = request
         self.task_hash = task_hash
-        self.order = order
+        self.stream = stream
 
+        self.blank = None  # handle of the first blank tab.
         self.browser = None
         self.display = None
+        self.displays = None  # display pool (see BrowserPool).
+        self.job = None  # job number within task (trace).
         self.keep_temp = None
+        self.network_native = request.browser.network == "native"  # no selenium-wire proxy, see update_network.
+        self.origins = set()  # origins of all loaded requests (documents, frames, third parties), see clear_storage.
         self.profile_dir = None
+        self.requests_documents = {}  # native network: request id -> (document url, url), see update_network.
+        self.rules = BlockRules(request.block_types, request.block_urls)
+        self.urls_blocked = {}  # documents and amount of their blocked requests, see block.
+        self.urls_data = {}  # captured documents and their data (status code, content type), see capture.
+
+        # browser settings which cannot be changed after browser creation (see BrowserPool).
+        self.key = browser_key(config, request)
 
         _, self.x, self.y = is_browser_geometry(
             "", request.browser.geometry, config.params.default.browser_geometry)
@@ -76,8 +123,12 @@ class GenericBrowser:
         _, self.rand_min, self.rand_max = is_tab_open_randomize(
             "", request.tab_open_randomize, config.params.default.tab_open_randomize)
 
+        # Captured requests are held by selenium-wire (with bodies), only the latest are kept,
+        # documents are recorded as they come (see capture).
         self.selenium_wire_options = {
             "backend": "default",
+            "request_storage": "memory",
+            "request_storage_max_size": DEFAULT_CAPTURE_STORAGE_SIZE,
         }
 
         if self.request.browser.proxy:
@@ -87,444 +138,759 @@ class GenericBrowser:
                 "no_proxy": "localhost,127.0.0.1"
             }
 
-    def fetch(self, urls, cookies, screenshots, scripts) -> dict:
-        chunks = []
+    def alive(self) -> bool:
+        try:
+            _ = self.browser.window_handles
+            return True
+        except Exception:
+            return False
 
-        # --------------------------------------------------------------------------------------------------
-        # Process tabs.
+    def bind(self, request, task_hash, stream):
+        # Attach existing browser to a new task.
+        self.request = request
+        self.task_hash = task_hash
+        self.stream = stream
+        self.rules = BlockRules(request.block_types, request.block_urls)
 
-        # There are could be errors during opening/awaiting/processing tabs, that is why
-        # we don't use "self.browser.current_url" inside exception handling,
-        # but use local variable "url" instead.
-        # Session can be broken in the middle because of Xvfb/Xvnc crashing.
-        #
-        # Example:
-        # return self.execute(Command.GET_CURRENT_URL)['value']
-        # selenium.common.exceptions.InvalidSessionIdException:
-        # Message: Tried to run command without establishing a connection
+        _, self.rand_min, self.rand_max = is_tab_open_randomize(
+            "", request.tab_open_randomize, self.config.params.default.tab_open_randomize)
 
-        urls_origin = ["0"] + urls  # list of original urls + first blank tab.
-        # list of final urls (after all redirects) + first blank tab.
-        urls_final = urls_origin.copy()
-        # list of final urls and their data (status code, content type) + first blank tab.
-        urls_final_data = {}
-
-        cookies = ["0"] + cookies  # list of screenshots + first blank tab.
-        screenshots = ["0"] + screenshots  # list of screenshots + first blank tab.
-        scripts = ["0"] + scripts  # list of scripts + first blank tab.
-
-        tabs_readiness = [False]  # list of tabs statuses + first blank tab.
-        tabs_retries = [0]  # list of tabs retries + first blank tab.
-        # list of tabs states (verbose) + first blank tab.
-        tabs_states = [""]
-        # list of timestamps when tabs were opened + first blank tab.
-        tabs_timestamp = [0]
-
-        # ------------------------------------------------------
-        # ------------------------------------------------------
-        # Close unwanted tabs (might be opened by an extension).
+        self.browser.implicitly_wait(0)
+        self.browser.set_page_load_timeout(self.request.page_timeout)
+        self.browser.set_script_timeout(self.request.script_timeout)
+
+    def block(self, request):
+        # Called by selenium-wire (proxy thread) for every request, blocked requests don't leave the proxy.
+        # Blocked requests are counted by Referer (cross-origin requests send the origin of document only).
+        if not self.rules:
+            return
+
+        kind = self.rules.match(request.url, request.headers.get("Sec-Fetch-Dest"))
+
+        if kind:
+            request.abort()
+            self.blocked(kind, request.headers.get("Referer", ""))
+
+    def blocked(self, kind, document):
+        self.urls_blocked[document] = self.urls_blocked.get(document, 0) + 1
+        metrics.blocked_requests.inc(kind, self.request.browser.type, self.request.client_id)
+
+    def blocked_amount(self, url) -> int:
+        # Requests blocked by the page, including requests known by the origin of the page.
+        origin = "{0.scheme}://{0.netloc}/".format(urlparse(url))
+        return self.urls_blocked.get(url, 0) + (self.urls_blocked.get(origin, 0) if origin != url else 0)
+
+    def block_tab(self, handle, url):
+        # Native network: set up blocking of a blank tab and load url (see block_tabs).
+        pass
+
+    def block_tabs(self) -> bool:
+        # Native network: tabs are opened blank if blocking is set up per tab before loading.
+        return False
+
+    def capture(self, request, response):
+        # Called by selenium-wire (proxy thread) for every response, only documents (tabs, frames aren't)
+        # are recorded, including redirects. Origins of all responses are recorded.
+        self.origins.add(url_origin(request.url))
+
+        dest = request.headers.get("Sec-Fetch-Dest")
+        content_type = response.headers.get("Content-Type", "")
+
+        if dest == "document" or (dest is None and content_type.startswith("text/html")):
+            self.urls_data[request.url] = (response.status_code, content_type)
+
+    def navigation(self, tab):
+        # Native network: document of the tab wasn't seen in network events, take it from navigation timing.
+        # Status code is 0 (unknown) if browser doesn't expose it (firefox), it isn't made up.
+        try:
+            self.browser.switch_to.window(tab.handle)
+            url, status_code, content_type = self.browser.execute_script(SCRIPT_NAVIGATION)
+
+            if not status_code:
+                logger.debug("[{}][{}] Status code isn't exposed by navigation timing: {}".format(
+                    self.request.client_id, self.task_hash, url))
+
+            self.urls_data[url] = (status_code, content_type)
+
+        except WebDriverException as e:
+            logger.debug("[{}][{}] Cannot get navigation timing: {}, {}".format(
+                self.request.client_id, self.task_hash, tab.url_final, e.msg))
+
+    def native_proxy(self):
+        # Native network: browser connects to the upstream proxy itself, proxy credentials aren't supported.
+        proxy = urlparse(self.request.browser.proxy)
+
+        if proxy.username or proxy.password:
+            logger.warning("[{}][{}] Proxy credentials aren't supported by native network: {}".format(
+                self.request.client_id, self.task_hash, proxy.hostname))
+
+        try:
+            port = proxy.port
+        except ValueError:
+            port = 0
+
+        if not proxy.hostname or port == 0:
+            logger.warning("[{}][{}] Proxy is skipped, url is invalid: {}".format(
+                self.request.client_id, self.task_hash, self.request.browser.proxy))
+            return None
+
+        # port isn't set, default port of proxy scheme.
+        if port is None:
+            port = 1080 if proxy.scheme.startswith("socks") else 3128
+
+        host = "[{}]".format(proxy.hostname) if ":" in proxy.hostname else proxy.hostname
+
+        # netloc is "host:port" (brackets of ipv6 host are kept), credentials are dropped.
+        return proxy._replace(netloc="{}:{}".format(host, port))
+
+    def update_network(self):
+        # Native network: record documents from browser network events (if any), see capture.
+        pass
+
+    def create_display(self) -> bool:
+        # Headless browsers don't need virtual display.
+        if self.request.browser.headless:
+            return True
+
+        try:
+            with self.phase("display_start"):
+                if self.displays:
+                    self.display = self.displays.lease((self.x, self.y))
+                else:
+                    self.display = start_display((self.x, self.y))
+        except Exception as e:
+            logger.warning("[{}][{}] Cannot create virtual display: {}".format(
+                self.request.client_id, self.task_hash, e))
+            return False
+
+        return True
+
+    def display_env(self):
+        # Browser is started by its driver on the display.
+        return self.display.env() if self.display else None
+
+    def clear_cookies(self):
+        # webdriver can delete cookies of current page domain only.
+        for handle in self.browser.window_handles:
+            self.browser.switch_to.window(handle)
+            self.browser.delete_all_cookies()
+
+    def clear_storage(self):
+        # webdriver has no access to storage of closed pages.
+        pass
+
+    def reset(self) -> bool:
+        # Prepare browser for the next task: one blank tab, no cookies and storage, no captured requests,
+        # initial geometry.
+        try:
+            self.clear_cookies()
+            self.clear_storage()
+
+            for handle in self.browser.window_handles[1:]:
+                self.browser.switch_to.window(handle)
+                self.browser.close()
+
+            self.browser.switch_to.window(self.browser.window_handles[0])
+            self.browser.get("about:blank")
+
+            if self.network_native:
+                self.update_network()
+            else:
+                del self.browser.requests
+
+            self.origins = set()
+            self.requests_documents = {}
+            self.urls_blocked = {}
+            self.urls_data = {}
+
+            self.browser.set_window_size(self.x, self.y)
+
+            self.stream = None
+
+            return True
+
+        except Exception as e:
+            logger.warning("[{}][{}] Cannot reset browser: {}".format(
+                self.request.client_id, self.task_hash, e))
 
+            return False
+
+    def close_tabs(self):
+        # Close unwanted tabs (might be opened by an extension).
         logger.debug("[{}][{}] Debug pre close delay: {}s".format(
             self.request.client_id, self.task_hash, self.request.debug.pre_close_delay))
         time.sleep(self.request.debug.pre_close_delay)
 
-        if len(self.browser.window_handles) > 1:
-            for i in reversed(range(1, len(self.browser.window_handles))):
-                self.browser.switch_to.window(self.browser.window_handles[i])
+        handles = self.browser.window_handles
+
+        if len(handles) > 1:
+            for handle in reversed(handles[1:]):
+                self.browser.switch_to.window(handle)
                 self.browser.close()
 
-            self.browser.switch_to.window(self.browser.window_handles[0])
+            self.browser.switch_to.window(handles[0])
 
-        # ------------------------------------------------------
-        # ------------------------------------------------------
-        # Open URLs.
+        self.blank = handles[0]
 
-        logger.debug("[{}][{}] Debug pre open delay: {}s".format(
-            self.request.client_id, self.task_hash, self.request.debug.pre_open_delay))
-        time.sleep(self.request.debug.pre_open_delay)
+    def close_tab(self, tab):
+        self.browser.switch_to.window(tab.handle)
+        self.browser.close()
+        self.browser.switch_to.window(self.blank)
 
-        for index in range(1, len(urls_origin)):
-            url = urls_origin[index]
+    def open_tab(self, item) -> Tab:
+        # Tabs are closed and opened in the middle of pipeline, new tab is found by its handle.
+        with self.phase("tab_open", item.index):
+            handles = set(self.browser.window_handles)
+            blank = self.block_tabs()
 
-            # ToDo: dirty hack: do this useless work for proper window handles ordering.
-            _ = self.browser.window_handles
+            self.browser.execute_script(SCRIPT_TAB_OPEN, "about:blank" if blank else item.url)
 
-            try:
-                self.browser.execute_script(
-                    'window.open("{0}","_blank");'.format(url))
-                tabs_readiness.append(False)
-                tabs_retries.append(0)
-                tabs_states.append("opened")
-                tabs_timestamp.append(get_timestamp())
-
-            except WebDriverException as e:
-                logger.error("[{}][{}] Browser error during open URL: {}, {}".format(
-                    self.request.client_id, self.task_hash, url, e))
-                return {self.order: chunks}
+            for _ in range(DEFAULT_TAB_OPEN_TRIES):
+                opened = [handle for handle in self.browser.window_handles if handle not in handles]
+                if opened:
+                    break
 
-            except Exception as e:
-                logger.error("[{}][{}] Unexpected error during open URL: {}, {}".format(
-                    self.request.client_id, self.task_hash, url, e))
-                return {self.order: chunks}
+                sleep(DEFAULT_TAB_OPEN_DELAY)
+            else:
+                raise WebDriverException("cannot find opened tab")
 
-            rand_sec = random.randint(self.rand_min, self.rand_max)
-            logger.debug("[{}][{}] Tab open randomize: {}s".format(
-                self.request.client_id, self.task_hash, rand_sec))
-            time.sleep(rand_sec)
+            if blank:
+                self.block_tab(opened[0], item.url)
 
-        # ------------------------------------------------------
-        # ------------------------------------------------------
-        # Wait for tabs loading.
+        rand_sec = random.randint(self.rand_min, self.rand_max)
+        logger.debug("[{}][{}] Tab open randomize: {}s".format(
+            self.request.client_id, self.task_hash, rand_sec))
+        time.sleep(rand_sec)
 
-        logger.debug("[{}][{}] Debug pre wait delay: {}s".format(
-            self.request.client_id, self.task_hash, self.request.debug.pre_wait_delay))
-        time.sleep(self.request.debug.pre_wait_delay)
+        return Tab(item, opened[0])
 
-        while True:
-            ready = True
+    def open(self, item, tabs) -> bool:
+        try:
+            tabs.append(self.open_tab(item))
+            return True
 
-            # Check if origin urls are completely loaded.
-            for index in range(1, len(self.browser.window_handles)):
-                url = urls_origin[index]
+        except WebDriverException as e:
+            logger.error("[{}][{}] Browser error during open URL: {}, {}".format(
+                self.request.client_id, self.task_hash, item.url, e))
 
-                if not tabs_readiness[index]:
-                    try:
-                        self.browser.switch_to.window(
-                            self.browser.window_handles[index])
+        except Exception as e:
+            logger.error("[{}][{}] Unexpected error during open URL: {}, {}".format(
+                self.request.client_id, self.task_hash, item.url, e))
 
-                        state = self.browser.execute_script(
-                            'return document.readyState;')
+        return False
 
-                        # save possible redirected url.
-                        if self.browser.current_url != 'about:blank':
-                            urls_final[index] = self.browser.current_url
+    def tab_ready(self, tab):
+        tab.ready = True
 
-                        tabs_states[index] = state
+        duration = monotonic() - tab.opened
+        metrics.phase_seconds.observe(duration, "tab_wait", self.request.browser.type, self.request.client_id)
 
-                        if state == "complete":
-                            tabs_readiness[index] = True
-                        else:
-                            sleep(self.config.params.default.tab_hop_delay)
-                            ready = False
+        if self.trace():
+            self.trace().add("tab_wait", tab.opened, duration, job=self.job, index=tab.item.index)
 
-                    except TimeoutException:
-                        logger.warning("[{}][{}] Timeout during waiting URL: {}".format(
-                            self.request.client_id, self.task_hash, url))
-                        ready = False
+    def phase(self, name, index=None):
+        # Phase duration goes to metrics and task trace.
+        return metrics.phase(name, self.request, self.trace(), job=self.job, index=index)
 
-                    except WebDriverException as e:
-                        logger.error("[{}][{}] Browser error during waiting URL: {}, {}".format(
-                            self.request.client_id, self.task_hash, url, e))
+    def trace(self):
+        return self.stream.trace if self.stream else None
+
+    def wait_tabs(self, tabs) -> bool:
+        # Check tabs once, return True if all of them are ready.
+        # State and url of a tab are taken at once, pass is delayed (once) if no tab became ready.
+        # With "load_event" tabs wait for the page event in turn instead (a pass takes up to "tab_hop_delay"),
+        # tab is ready as soon as the event is fired.
+        ready = True
+        ready_new = False
+
+        waiting = len([tab for tab in tabs if not tab.ready])
+        event_wait = int(self.config.params.default.tab_hop_delay * 1000 / max(waiting, 1))
+
+        # Check if origin urls are completely loaded.
+        for tab in tabs:
+            url = tab.item.url
+
+            if not tab.ready:
+                try:
+                    self.browser.switch_to.window(tab.handle)
+
+                    if self.request.load_event:
+                        reached, current_url, state = self.browser.execute_async_script(
+                            SCRIPT_PAGE_EVENT, self.request.load_event, event_wait)
+                    else:
+                        state, current_url = self.browser.execute_script(SCRIPT_READY_STATE)
+                        reached = state == "complete"
+
+                    # save possible redirected url.
+                    if current_url != 'about:blank':
+                        tab.url_final = current_url
+
+                    tab.state = state
+
+                    if reached:
+                        self.tab_ready(tab)
+                        ready_new = True
+                    else:
                         ready = False
 
-                    except Exception as e:
-                        logger.error("[{}][{}] Unexpected error during waiting URL: {}, {}".format(
-                            self.request.client_id, self.task_hash, url, e))
-                        return {self.order: chunks}
+                except TimeoutException:
+                    logger.warning("[{}][{}] Timeout during waiting URL: {}".format(
+                        self.request.client_id, self.task_hash, url))
+                    metrics.timeouts.inc("wait", self.request.browser.type, self.request.client_id)
+                    ready = False
+
+                # page was navigated while waiting for its event.
+                except JavascriptException as e:
+                    logger.debug("[{}][{}] Page event waiting is interrupted: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e.msg))
+                    ready = False
+
+                except WebDriverException as e:
+                    logger.error("[{}][{}] Browser error during waiting URL: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e))
+                    ready = False
+
+                except Exception as e:
+                    logger.error("[{}][{}] Unexpected error during waiting URL: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e))
+                    raise
+
+                # Stop page loading if timeout is reached.
+                time_diff = get_timestamp() - tab.timestamp
+
+                # Enough is enough, stop waiting.
+                if not tab.ready and time_diff > self.request.page_timeout:
+                    try:
+                        self.browser.execute_script(SCRIPT_STOP)
+                    except Exception:
+                        pass
 
-                    # Stop page loading if timeout is reached.
-                    time_diff = get_timestamp() - tabs_timestamp[index]
+                    self.tab_ready(tab)
+                    ready_new = True
+                    metrics.timeouts.inc("page", self.request.browser.type, self.request.client_id)
 
-                    # Enough is enough, stop waiting.
-                    if not tabs_readiness[index] and time_diff > self.request.page_timeout:
-                        try:
-                            self.browser.execute_script("window.stop();")
-                            tabs_readiness[index] = True
-                        except Exception:
-                            tabs_readiness[index] = True
+                    logger.warning("[{}][{}] Timeout during page content loading for URL: {}: {}s".format(
+                        self.request.client_id, self.task_hash, url, time_diff))
 
-                        logger.warning("[{}][{}] Timeout during page content loading for URL: {}: {}s".format(
-                            self.request.client_id, self.task_hash, url, time_diff))
+        # Check if final urls should be reloaded.
+        self.update_network()
 
-            # Check if final urls should be reloaded.
-            urls_final_data_old = len(urls_final_data)
-            # too costly to do for each tab.
-            urls_final_data = update_urls(self.browser.requests)
+        logger.debug("[{}][{}] Total captured URLs: {}".format(
+            self.request.client_id, self.task_hash, len(self.urls_data)))
 
-            logger.debug("[{}][{}] Total captured URLs: {} -> {}".format(
-                self.request.client_id, self.task_hash, urls_final_data_old, len(urls_final_data)))
+        for tab in tabs:
+            url = tab.url_final
 
-            for index in range(1, len(self.browser.window_handles)):
-                url = urls_final[index]
+            # loading tabs have nothing to check yet.
+            if not tab.ready:
+                continue
 
-                try:
-                    status_code, _ = urls_final_data[url]
-
-                    if status_code in self.request.retry_codes and \
-                            tabs_retries[index] < self.request.retry_codes_tries:
-                        self.browser.switch_to.window(
-                            self.browser.window_handles[index])
-                        self.browser.execute_script('location.reload();')
-
-                        tabs_readiness[index] = False
-                        tabs_retries[index] += 1
-                        tabs_states[index] = "reloaded"
-                        tabs_timestamp[index] = get_timestamp()
-
-                        logger.warning("[{}][{}] Trying to reload page for URL: code: {}, {}, tries: {} of {}".format(
-                            self.request.client_id,
-                            self.task_hash,
-                            status_code,
-                            url,
-                            tabs_retries[index],
-                            self.request.retry_codes_tries
-                        ))
+            try:
+                if self.network_native and url not in self.urls_data:
+                    self.navigation(tab)
 
-                        ready = False
+                status_code, _ = self.urls_data[url]
+
+                if status_code in self.request.retry_codes and \
+                        tab.retries < self.request.retry_codes_tries:
+                    self.browser.switch_to.window(tab.handle)
+                    self.browser.execute_script(SCRIPT_RELOAD)
 
-                except KeyError:
-                    logger.warning("[{}][{}] Cannot find captured URL: {}".format(
+                    tab.ready = False
+                    tab.retries += 1
+                    metrics.retries.inc(self.request.browser.type, self.request.client_id)
+                    tab.state = "reloaded"
+                    tab.timestamp = get_timestamp()
+
+                    logger.warning("[{}][{}] Trying to reload page for URL: code: {}, {}, tries: {} of {}".format(
                         self.request.client_id,
                         self.task_hash,
-                        url
+                        status_code,
+                        url,
+                        tab.retries,
+                        self.request.retry_codes_tries
                     ))
 
-            # Show URL states after all.
-            for index in range(1, len(self.browser.window_handles)):
-                url = urls_final[index]
+                    ready = False
 
-                logger.debug("[{}][{}] Tab {}: url: {}, ready: {}, state: {}".format(
+            except KeyError:
+                logger.warning("[{}][{}] Cannot find captured URL: {}".format(
                     self.request.client_id,
                     self.task_hash,
-                    index,
-                    url,
-                    tabs_readiness[index],
-                    tabs_states[index]
+                    url
                 ))
 
-            # Quit.
-            if ready:
-                break
+        # Show URL states after all.
+        for index, tab in enumerate(tabs, 1):
+            logger.debug("[{}][{}] Tab {}: url: {}, ready: {}, state: {}".format(
+                self.request.client_id,
+                self.task_hash,
+                index,
+                tab.url_final,
+                tab.ready,
+                tab.state
+            ))
+
+        # Nothing to process yet, give tabs time (tabs have waited for events already).
+        if not ready and not ready_new and not self.request.load_event:
+            sleep(self.config.params.default.tab_hop_delay)
+
+        return ready
+
+    def process_tab(self, tab):
+        # Collect page data and pass result to the task.
+        url = tab.item.url
+        result_uuid = str(uuid.uuid4())
+
+        self.browser.switch_to.window(tab.handle)
+
+        # ------------------------------------------------------------
+        # Capture page at once, page size is checked by browser, big pages aren't passed from browser.
+
+        with self.phase("page_capture", tab.item.index):
+            page_url, page_title, page_size, page_source = self.browser.execute_script(
+                SCRIPT_PAGE_CAPTURE, self.request.page_size)
+
+        try:
+            status_code, content_type = self.urls_data[page_url]
+        except KeyError:
+            status_code = 400
+            content_type = "unknown"
+
+        blocked = self.blocked_amount(page_url)
+
+        # Result will contain all data.
+        result = webchela_pb2.Result(
+            UUID=result_uuid,
+            page_url=page_url,
+            page_title=page_title,
+            url=url,
+            url_index=tab.item.index,
+            status_code=status_code,
+            content_type=content_type,
+            blocked_requests=blocked
+        )
+
+        if self.request.page_body_raw:
+            page_source = page_source.encode()
+
+        if page_size > self.request.page_size:
+            msg = "[{}][{}] Page size exceeded: {}, {}".format(
+                self.request.client_id, self.task_hash, url, human_size(page_size))
+
+            logger.warning(msg)
+            page_source = msg.encode() if self.request.page_body_raw else msg
+            metrics.page_size_exceeded.inc(self.request.browser.type, self.request.client_id)
+
+        if self.request.page_body_raw:
+            result.page_body_raw = page_source
+        else:
+            result.page_body = page_source
+
+        # ------------------------------------------------------------
+        # Set cookies.
+
+        logger.debug("[{}][{}] Debug pre cookie delay: {}s".format(
+            self.request.client_id, self.task_hash, self.request.debug.pre_cookie_delay))
+        time.sleep(self.request.debug.pre_cookie_delay)
+
+        for cookie_index, cookie_value in enumerate(
+                re.split(self.config.params.default.unique_separator, tab.item.cookie)):
+
+            if cookie_value:
+                try:
+                    cookie_object = json.loads(cookie_value)
+                    if isinstance(cookie_object, list):
+                        for o in cookie_object:
+                            self.browser.add_cookie(o)
+                    else:
+                        self.browser.add_cookie(cookie_object)
+
+                except Exception as e:
+                    msg = "[{}][{}] Cookie injecting error: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e)
 
-        # ------------------------------------------------------
-        # ------------------------------------------------------
-        # Processing tabs.
+                    logger.warning(msg)
 
-        logger.debug("[{}][{}] Debug pre process delay: {}s".format(
-            self.request.client_id, self.task_hash, self.request.debug.pre_process_delay))
-        time.sleep(self.request.debug.pre_process_delay)
+        # reload page after cookie injecting.
+        if tab.item.cookie:
+            self.browser.execute_script(SCRIPT_RELOAD)
 
-        for index in range(1, len(self.browser.window_handles)):
-            url = urls_origin[index]
-            handle = self.browser.window_handles[index]
-            result_uuid = str(uuid.uuid4())
+        # ------------------------------------------------------------
+        # Resize browser window.
 
+        if self.request.browser.geometry == "dynamic":
             try:
-                self.browser.switch_to.window(handle)
+                width = self.browser.execute_script(SCRIPT_PAGE_WIDTH)
+                height = self.browser.execute_script(SCRIPT_PAGE_HEIGHT)
 
+                self.browser.set_window_size(width, height)
+
+            except Exception as e:
+                msg = "[{}][{}] Browser window maximizing error: {}, {}".format(
+                    self.request.client_id, self.task_hash, url, e)
+                logger.warning(msg)
+
+        # ------------------------------------------------------------
+        # Execute javascript code.
+
+        logger.debug("[{}][{}] Debug pre script delay: {}s".format(
+            self.request.client_id, self.task_hash, self.request.debug.pre_script_delay))
+        time.sleep(self.request.debug.pre_script_delay)
+
+        for script_index, script_value in enumerate(
+                re.split(self.config.params.default.unique_separator, tab.item.script)):
+
+            if script_value:
                 try:
-                    status_code = urls_final_data[self.browser.current_url][0]
-                    content_type = urls_final_data[self.browser.current_url][1]
-                except KeyError:
-                    status_code = 400
-                    content_type = "unknown"
-
-                # Result will contain all data.
-                result = webchela_pb2.Result(
-                    UUID=result_uuid,
-                    page_url=self.browser.current_url,
-                    page_title=self.browser.title,
-                    url=url,
-                    status_code=status_code,
-                    content_type=content_type
-                )
-
-                # ------------------------------------------------------------
-                # Check page size.
-
-                page_size = len(self.browser.page_source.encode())
-                if page_size > self.request.page_size:
-                    msg = "[{}][{}] Page size exceeded: {}, {}".format(
-                        self.request.client_id, self.task_hash, url, human_size(page_size))
+                    with self.phase("script", tab.item.index):
+                        script_output = self.browser.execute_script(script_value)
+
+                    result.scripts.append(str(script_output))
+                    result.scripts_id.append(script_index)
+
+                except JavascriptException as e:
+                    msg = "[{}][{}] Javascript execution error: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e.msg)
 
                     logger.warning(msg)
-                    result.page_body = msg
-                else:
-                    result.page_body = self.browser.page_source
+                    result.scripts.append(msg)
+                    result.scripts_id.append(script_index)
 
-                # ------------------------------------------------------------
-                # Set cookies.
+                except TimeoutException:
+                    msg = "[{}][{}] Javascript execution timeout: {}, {}".format(
+                        self.request.client_id, self.task_hash, url,
+                        self.request.script_timeout)
 
-                logger.debug("[{}][{}] Debug pre cookie delay: {}s".format(
-                    self.request.client_id, self.task_hash, self.request.debug.pre_cookie_delay))
-                time.sleep(self.request.debug.pre_cookie_delay)
+                    logger.warning(msg)
+                    metrics.timeouts.inc("script", self.request.browser.type, self.request.client_id)
+                    result.scripts.append(msg)
+                    result.scripts_id.append(script_index)
 
-                for cookie_index, cookie_value in enumerate(
-                        re.split(self.config.params.default.unique_separator, cookies[index])):
+        # ------------------------------------------------------------
+        # Get screenshots.
 
-                    if cookie_value:
-                        try:
-                            cookie_object = json.loads(cookie_value)
-                            if isinstance(cookie_object, list):
-                                for o in cookie_object:
-                                    self.browser.add_cookie(o)
-                            else:
-                                self.browser.add_cookie(cookie_object)
+        logger.debug("[{}][{}] Debug pre screenshot delay: {}s".format(
+            self.request.client_id, self.task_hash, self.request.debug.pre_screenshot_delay))
+        time.sleep(self.request.debug.pre_screenshot_delay)
 
-                        except Exception as e:
-                            msg = "[{}][{}] Cookie injecting error: {}, {}".format(
-                                self.request.client_id, self.task_hash, url, e)
+        if tab.item.screenshot:
+            self.browser.implicitly_wait(self.request.screenshot_timeout)
 
-                            logger.warning(msg)
+        for screenshot_index, screenshot_value in enumerate(
+                re.split(self.config.params.default.unique_separator, tab.item.screenshot)):
 
-                # reload page after cookie injecting.
-                if cookies[index]:
-                    self.browser.execute_script('location.reload();')
+            if screenshot_value:
+                prefix, value = screenshot_value.split(':')
 
-                # ------------------------------------------------------------
-                # Resize browser window.
+                screenshot_elements = None
 
-                if self.request.browser.geometry == "dynamic":
-                    try:
-                        width = self.browser.execute_script(
-                            "return Math.max( document.body.scrollWidth, document.body.offsetWidth, "
-                            "document.documentElement.clientWidth, document.documentElement.scrollWidth, "
-                            "document.documentElement.offsetWidth );")
-                        height = self.browser.execute_script(
-                            "return Math.max( document.body.scrollHeight, document.body.offsetHeight, "
-                            "document.documentElement.clientHeight, document.documentElement.scrollHeight, "
-                            "document.documentElement.offsetHeight );")
-
-                        self.browser.set_window_size(width, height)
-
-                    except Exception as e:
-                        msg = "[{}][{}] Browser window maximizing error: {}, {}".format(
-                            self.request.client_id, self.task_hash, url, e)
-                        logger.warning(msg)
-
-                # ------------------------------------------------------------
-                # Execute javascript code.
-
-                logger.debug("[{}][{}] Debug pre script delay: {}s".format(
-                    self.request.client_id, self.task_hash, self.request.debug.pre_script_delay))
-                time.sleep(self.request.debug.pre_script_delay)
-
-                for script_index, script_value in enumerate(
-                        re.split(self.config.params.default.unique_separator, scripts[index])):
-
-                    if script_value:
-                        try:
-                            script_output = self.browser.execute_script(script_value)
-
-                            result.scripts.append(str(script_output))
-                            result.scripts_id.append(script_index)
-
-                        except JavascriptException as e:
-                            msg = "[{}][{}] Javascript execution error: {}, {}".format(
-                                self.request.client_id, self.task_hash, url, e.msg)
-
-                            logger.warning(msg)
-                            result.scripts.append(msg)
-                            result.scripts_id.append(script_index)
-
-                        except TimeoutException:
-                            msg = "[{}][{}] Javascript execution timeout: {}, {}".format(
-                                self.request.client_id, self.task_hash, url,
-                                self.request.script_timeout)
-
-                            logger.warning(msg)
-                            result.scripts.append(msg)
-                            result.scripts_id.append(script_index)
-
-                # ------------------------------------------------------------
-                # Get screenshots.
-
-                logger.debug("[{}][{}] Debug pre screenshot delay: {}s".format(
-                    self.request.client_id, self.task_hash, self.request.debug.pre_screenshot_delay))
-                time.sleep(self.request.debug.pre_screenshot_delay)
-
-                if len(screenshots) > 1:
-                    self.browser.implicitly_wait(self.request.screenshot_timeout)
-
-                for screenshot_index, screenshot_value in enumerate(
-                        re.split(self.config.params.default.unique_separator, screenshots[index])):
-
-                    if screenshot_value:
-                        prefix, value = screenshot_value.split(':')
-
-                        screenshot_elements = None
-
-                        try:
-                            match prefix:
-                                case "class":
-                                    screenshot_elements = self.browser.find_elements(By.CLASS_NAME, value)
-                                case "css":
-                                    screenshot_elements = self.browser.find_elements(By.CSS_SELECTOR, value)
-                                case "id":
-                                    screenshot_elements = self.browser.find_elements(By.ID, value)
-                                case "name":
-                                    screenshot_elements = self.browser.find_elements(By.NAME, value)
-                                case "tag":
-                                    screenshot_elements = self.browser.find_elements(By.TAG_NAME, value)
-                                case "xpath":
-                                    screenshot_elements = self.browser.find_elements(By.XPATH, value)
-                                case _:
-                                    pass
-
-                        except NoSuchElementException as e:
-                            msg = "[{}][{}] Screenshot elements searching error: {}, {}".format(
-                                self.request.client_id, self.task_hash, url, e.msg)
-
-                            logger.warning(msg)
-
-                        try:
-                            for screenshot_element in screenshot_elements:
-                                r = screenshot_element.rect
-                                if r["width"] > 0 and r["height"] > 0:
-                                    self.browser.execute_script("arguments[0].scrollIntoView(true);", screenshot_element)
+                try:
+                    match prefix:
+                        case "class":
+                            screenshot_elements = self.browser.find_elements(By.CLASS_NAME, value)
+                        case "css":
+                            screenshot_elements = self.browser.find_elements(By.CSS_SELECTOR, value)
+                        case "id":
+                            screenshot_elements = self.browser.find_elements(By.ID, value)
+                        case "name":
+                            screenshot_elements = self.browser.find_elements(By.NAME, value)
+                        case "tag":
+                            screenshot_elements = self.browser.find_elements(By.TAG_NAME, value)
+                        case "xpath":
+                            screenshot_elements = self.browser.find_elements(By.XPATH, value)
+                        case _:
+                            pass
+
+                except NoSuchElementException as e:
+                    msg = "[{}][{}] Screenshot elements searching error: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e.msg)
+
+                    logger.warning(msg)
+
+                try:
+                    for screenshot_element in screenshot_elements:
+                        r = screenshot_element.rect
+                        if r["width"] > 0 and r["height"] > 0:
+                            self.browser.execute_script(SCRIPT_SCROLL_INTO_VIEW, screenshot_element)
+                            with self.phase("screenshot", tab.item.index):
+                                # binary screenshots are encoded later (see ScreenshotEncoder).
+                                if self.request.screenshot_format:
+                                    result.screenshots_binary.append(screenshot_element.screenshot_as_png)
+                                else:
                                     result.screenshots.append(screenshot_element.screenshot_as_base64)
-                                    result.screenshots_id.append(screenshot_index)
+                            result.screenshots_id.append(screenshot_index)
 
-                        except JavascriptException as e:
-                            msg = "[{}][{}] Screenshot elements processing error: {}, {}".format(
-                                self.request.client_id, self.task_hash, url, e.msg)
-                            logger.warning(msg)
+                except JavascriptException as e:
+                    msg = "[{}][{}] Screenshot elements processing error: {}, {}".format(
+                        self.request.client_id, self.task_hash, url, e.msg)
+                    logger.warning(msg)
 
-                # ------------------------------------------------------------
-                # Show what we got.
+        # ------------------------------------------------------------
+        # Show what we got.
 
-                logger.debug("uuid: {}, code: {}, url: {}, title: {}".format(
-                    result_uuid, status_code, url, self.browser.title))
+        logger.debug("uuid: {}, code: {}, url: {}, title: {}".format(
+            result_uuid, status_code, url, page_title))
 
-                # ------------------------------------------------------------
-                # Serialize and split result into chunks.
-                result_binary = result.SerializeToString()
+        # ------------------------------------------------------------
+        # Pass result to the task, it will be serialized and split into chunks there.
+        self.stream.put(tab.item.index, result)
 
-                if result.ByteSize() > self.request.chunk_size:
-                    binary_parts = [result_binary[i:i + self.request.chunk_size]
-                                    for i in range(0, len(result_binary), self.request.chunk_size)]
+        if self.trace():
+            self.trace().add("url", tab.opened, monotonic() - tab.opened, job=self.job, index=tab.item.index,
+                             url=url, status_code=status_code, retries=tab.retries, blocked=blocked)
 
-                    for part in range(len(binary_parts)):
-                        chunk = webchela_pb2.Chunk(
-                            chunk=binary_parts[part]
-                        )
+    def process(self, tab) -> bool:
+        try:
+            self.process_tab(tab)
+            return True
 
-                        if part == len(binary_parts) - 1:
-                            chunk.end = True
+        except WebDriverException as e:
+            logger.error("[{}][{}] Browser error during processing URL: {}, {}".format(
+                self.request.client_id, self.task_hash, tab.item.url, e))
 
-                        chunks.append(chunk)
+        except Exception as e:
+            logger.error("[{}][{}] Unexpected error during processing URL: {}, {}".format(
+                self.request.client_id, self.task_hash, tab.item.url, e))
 
-                else:
-                    chunk = webchela_pb2.Chunk(
-                        chunk=result_binary,
-                        end=True
-                    )
+        return False
 
-                    chunks.append(chunk)
+    def fetch(self, items) -> int:
+        # Open all urls, wait for all of them, process them one by one.
+        # Every processed url goes to the task stream right away, return amount of processed urls.
+        processed = 0
+        tabs = []
 
-            except WebDriverException as e:
-                logger.error("[{}][{}] Browser error during processing URL: {}, {}".format(
-                    self.request.client_id, self.task_hash, url, e))
-                return {self.order: chunks}
+        # There are could be errors during opening/awaiting/processing tabs, that is why
+        # we don't use "self.browser.current_url" inside exception handling,
+        # but use local variable "url" instead.
+        # Session can be broken in the middle because of Xvfb/Xvnc crashing.
+        #
+        # Example:
+        # return self.execute(Command.GET_CURRENT_URL)['value']
+        # selenium.common.exceptions.InvalidSessionIdException:
+        # Message: Tried to run command without establishing a connection
 
-            except Exception as e:
-                logger.error("[{}][{}] Unexpected error during processing URL: {}, {}".format(
-                    self.request.client_id, self.task_hash, url, e))
-                return {self.order: chunks}
+        try:
+            self.close_tabs()
 
-        return {self.order: chunks}
+            # ------------------------------------------------------
+            # Open URLs.
 
-    def __del__(self):
+            logger.debug("[{}][{}] Debug pre open delay: {}s".format(
+                self.request.client_id, self.task_hash, self.request.debug.pre_open_delay))
+            time.sleep(self.request.debug.pre_open_delay)
+
+            for item in items:
+                if not self.open(item, tabs):
+                    return processed
+
+            # ------------------------------------------------------
+            # Wait for tabs loading.
+
+            logger.debug("[{}][{}] Debug pre wait delay: {}s".format(
+                self.request.client_id, self.task_hash, self.request.debug.pre_wait_delay))
+            time.sleep(self.request.debug.pre_wait_delay)
+
+            try:
+                while not self.wait_tabs(tabs):
+                    pass
+            except Exception:
+                return processed
+
+            # ------------------------------------------------------
+            # Processing tabs.
+
+            logger.debug("[{}][{}] Debug pre process delay: {}s".format(
+                self.request.client_id, self.task_hash, self.request.debug.pre_process_delay))
+            time.sleep(self.request.debug.pre_process_delay)
+
+            for tab in tabs:
+                if not self.process(tab):
+                    return processed
+
+                processed += 1
+
+            return processed
+
+        except Exception as e:
+            logger.error("[{}][{}] Unexpected error during fetching URLs: {}".format(
+                self.request.client_id, self.task_hash, e))
+            return processed
+
+        finally:
+            # Urls without results (browser errors) shouldn't hold ordered stream.
+            for item in items:
+                self.stream.skip(item.index)
+
+    def pipeline(self, queue, preempted=None) -> int:
+        # Sliding window of tabs: "instance_tab" tabs are kept in flight, a ready tab is processed
+        # and closed right away and the next url from the task queue is opened in its place,
+        # so slow pages don't hold the whole batch. Return amount of processed urls.
+        # New urls aren't opened if "preempted" returns True (other clients wait for browser slot),
+        # at least one url is processed.
+        processed = 0
+        tabs = []
+
+        try:
+            self.close_tabs()
+
+            while True:
+                stopped = processed > 0 and preempted is not None and preempted()
+
+                # Don't wait for stream space while tabs are in flight, ordered stream might wait for them.
+                while not stopped and len(tabs) < self.request.browser.instance_tab:
+                    items = queue.take(1, block=not tabs)
+                    if not items:
+                        break
+
+                    logger.debug("[{}][{}] Debug pre open delay: {}s".format(
+                        self.request.client_id, self.task_hash, self.request.debug.pre_open_delay))
+                    time.sleep(self.request.debug.pre_open_delay)
+
+                    if not self.open(items[0], tabs):
+                        self.stream.skip(items[0].index)
+                        return processed
+
+                if not tabs:
+                    return processed
+
+                try:
+                    self.wait_tabs(tabs)
+                except Exception:
+                    return processed
+
+                for tab in [tab for tab in tabs if tab.ready]:
+                    logger.debug("[{}][{}] Debug pre process delay: {}s".format(
+                        self.request.client_id, self.task_hash, self.request.debug.pre_process_delay))
+                    time.sleep(self.request.debug.pre_process_delay)
+
+                    tabs.remove(tab)
+
+                    if not self.process(tab):
+                        self.stream.skip(tab.item.index)
+                        return processed
+
+                    processed += 1
+
+                    try:
+                        self.close_tab(tab)
+                    except WebDriverException as e:
+                        logger.error("[{}][{}] Browser error during closing URL: {}, {}".format(
+                            self.request.client_id, self.task_hash, tab.item.url, e))
+                        return processed
+
+        except Exception as e:
+            logger.error("[{}][{}] Unexpected error during fetching URLs: {}".format(
+                self.request.client_id, self.task_hash, e))
+            return processed
+
+        finally:
+            # Urls without results (browser errors) shouldn't hold ordered stream.
+            for tab in tabs:
+                self.stream.skip(tab.item.index)
+
+    def destroy(self):
         if self.browser:
             try:
                 self.browser.quit()
@@ -532,13 +898,20 @@ class GenericBrowser:
                 logger.error("[{}][{}] Cannot close browser properly: {}".format(
                     self.request.client_id, self.task_hash, e))
 
+            self.browser = None
+
         if self.display:
             try:
-                self.display.stop()
+                if self.displays:
+                    self.displays.release(self.display)
+                else:
+                    self.display.stop()
             except Exception as e:
                 logger.error("[{}][{}] Cannot stop virtual display properly: {}".format(
                     self.request.client_id, self.task_hash, e))
 
+            self.display = None
+
         if self.profile_dir and not self.keep_temp:
             try:
                 shutil.rmtree(self.profile_dir)
@@ -546,19 +919,20 @@ class GenericBrowser:
                 logger.error("[{}][{}] Cannot clean temporary directory properly: {}".format(
                     self.request.client_id, self.task_hash, e))
 
+            self.profile_dir = None
+
+    def __del__(self):
+        self.destroy()
+
 
 class ChromeGenericBrowser(GenericBrowser):
-    def __init__(self, config, request, task_hash, order):
-        super().__init__(config, request, task_hash, order)
+    poolable = True
+
+    def __init__(self, config, request, task_hash, stream):
+        super().__init__(config, request, task_hash, stream)
 
     def create_browser(self) -> bool:
-        try:
-            self.display = Display(
-                backend="xvnc", size=(self.x, self.y), rfbport=0)
-            self.display.start()
-        except Exception as e:
-            logger.warning("[{}][{}] Cannot create virtual display: {}".format(
-                self.request.client_id, self.task_hash, e))
+        if not self.create_display():
             return False
 
         if self.config.params.default.chrome_profile:
@@ -598,8 +972,13 @@ class ChromeGenericBrowser(GenericBrowser):
                 continue
 
         # add application related arguments.
-        options.add_argument("in-process-gpu")  # virtualgl
-        options.add_argument("use-gl=egl")      # virtualgl
+        if self.request.browser.headless:
+            options.add_argument("headless=new")
+            options.add_argument("window-size={},{}".format(self.x, self.y))
+        else:
+            options.add_argument("in-process-gpu")  # virtualgl
+            options.add_argument("use-gl=egl")      # virtualgl
+
         options.add_argument("no-sandbox")
         options.add_argument("user-data-dir={}".format(self.profile_dir))
 
@@ -609,6 +988,15 @@ class ChromeGenericBrowser(GenericBrowser):
             "excludeSwitches", ["enable-automation", "test-type"])
         options.add_experimental_option("useAutomationExtension", False)
 
+        # native network: documents are taken from devtools network events (performance log).
+        if self.network_native:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+            proxy = self.native_proxy() if self.request.browser.proxy else None
+            if proxy:
+                options.add_argument("proxy-server={}://{}".format(proxy.scheme, proxy.netloc))
+
         # add extensions.
         for extension in self.request.browser.extension:
             try:
@@ -623,22 +1011,34 @@ class ChromeGenericBrowser(GenericBrowser):
         try:
             log = os.path.join(self.profile_dir, "chromedriver.log")
 
-            self.browser = webdriver.Chrome(
-                options=options,
-                seleniumwire_options=self.selenium_wire_options,
-                service=ChromeService(
-                    executable_path=CHROME_CHROMEDRIVER_WRAPPER,
-                    service_args=[
-                        self.config.params.default.chrome_driver_path,
-                        "--log-level={}".format(self.config.params.default.log_level)
-                    ],
-                    log_output=log
-                ))
+            service = ChromeService(
+                executable_path=CHROME_CHROMEDRIVER_WRAPPER,
+                service_args=[
+                    self.config.params.default.chrome_driver_path,
+                    "--log-level={}".format(self.config.params.default.log_level)
+                ],
+                log_output=log,
+                env=self.display_env()
+            )
+
+            with self.phase("browser_launch"):
+                if self.network_native:
+                    self.browser = native_webdriver.Chrome(options=options, service=service)
+                else:
+                    self.browser = webdriver.Chrome(
+                        options=options,
+                        seleniumwire_options=self.selenium_wire_options,
+                        service=service)
         except WebDriverException as e:
             logger.error("[{}][{}] Cannot create browser: {}".format(
                 self.request.client_id, self.task_hash, e))
             return False
 
+        # record documents, block requests.
+        if not self.network_native:
+            self.browser.request_interceptor = self.block
+            self.browser.response_interceptor = self.capture
+
         # set geometry.
         self.browser.set_window_size(self.x, self.y)
 
@@ -648,29 +1048,80 @@ class ChromeGenericBrowser(GenericBrowser):
 
         return True
 
-    def process(self, urls, cookies, screenshots, scripts) -> dict:
-        if self.create_browser():
-            return self.fetch(urls, cookies, screenshots, scripts)
-        else:
-            return {}
+    def clear_cookies(self):
+        # cookies of all domains.
+        self.browser.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+    def clear_storage(self):
+        # storage (local, indexeddb, cache storage, service workers etc.) of every loaded origin (documents,
+        # frames, third parties) and http cache.
+        if self.network_native:
+            self.update_network()
+
+        self.browser.execute_cdp_cmd("Network.clearBrowserCache", {})
+
+        origins = self.origins | {url_origin(url) for url in self.urls_data}
+
+        for origin in sorted(origin for origin in origins if origin.startswith("http")):
+            self.browser.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    def block_tab(self, handle, url):
+        # Blocking of devtools is set per tab.
+        self.browser.switch_to.window(handle)
+        self.browser.execute_cdp_cmd("Network.enable", {})
+        self.browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.rules.url_patterns(url)})
+        self.browser.execute_script(SCRIPT_LOCATION, url)
+
+    def block_tabs(self) -> bool:
+        return self.network_native and bool(self.rules)
+
+    def update_network(self):
+        # Performance log is drained on every call, documents (including redirects) are recorded,
+        # requests blocked by devtools (see block_tab) are counted by their documents.
+        for entry in self.browser.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message["method"]
+            params = message["params"]
+
+            if method == "Network.requestWillBeSent":
+                self.origins.add(url_origin(params["request"]["url"]))
+
+                if self.rules:
+                    self.requests_documents[params["requestId"]] = (
+                        params.get("documentURL", ""), params["request"]["url"])
+
+            elif method == "Network.loadingFailed" or method == "Network.loadingFinished":
+                document, url = self.requests_documents.pop(params["requestId"], ("", ""))
+
+                if params.get("blockedReason") == "inspector":
+                    self.blocked(self.rules.match(url) or "url", document)
+
+                continue
+
+            if params.get("type") != "Document":
+                continue
+
+            if method == "Network.responseReceived":
+                response = params["response"]
+            elif method == "Network.requestWillBeSent" and "redirectResponse" in params:
+                response = params["redirectResponse"]
+            else:
+                continue
+
+            headers = {key.lower(): value for key, value in response.get("headers", {}).items()}
+            self.urls_data[response["url"]] = (response["status"], headers.get("content-type", response["mimeType"]))
 
     def __del__(self):
         super(ChromeGenericBrowser, self).__del__()
 
 
 class FirefoxGenericBrowser(GenericBrowser):
-    def __init__(self, config, request, task_hash, order):
+    def __init__(self, config, request, task_hash, stream):
         super(FirefoxGenericBrowser, self).__init__(
-            config, request, task_hash, order)
+            config, request, task_hash, stream)
 
     def create_browser(self) -> bool:
-        try:
-            self.display = Display(
-                backend="xvnc", size=(self.x, self.y), rfbport=0)
-            self.display.start()
-        except Exception as e:
-            logger.warning("[{}][{}] Cannot create virtual display: {}".format(
-                self.request.client_id, self.task_hash, e))
+        if not self.create_display():
             return False
 
         if self.config.params.default.firefox_profile:
@@ -702,6 +1153,8 @@ class FirefoxGenericBrowser(GenericBrowser):
 
         # add application related arguments.
         options.add_argument("--new-instance")
+        if self.request.browser.headless:
+            options.add_argument("-headless")
         options.add_argument("-profile")
         options.add_argument(self.profile_dir)
         # open urls in tabs, not in windows.
@@ -711,6 +1164,35 @@ class FirefoxGenericBrowser(GenericBrowser):
         # disable all media autoplaying.
         options.set_preference("media.autoplay.default", 5)
 
+        # native network: documents are taken from navigation timing (see navigation).
+        proxy = self.native_proxy() if self.network_native and self.request.browser.proxy else None
+        if proxy:
+            options.set_preference("network.proxy.type", 1)
+            options.set_preference("network.proxy.no_proxies_on", "localhost,127.0.0.1")
+
+            if proxy.scheme.startswith("socks"):
+                options.set_preference("network.proxy.socks", proxy.hostname)
+                options.set_preference("network.proxy.socks_port", proxy.port)
+                options.set_preference("network.proxy.socks_version", 4 if proxy.scheme.startswith("socks4") else 5)
+                options.set_preference("network.proxy.socks_remote_dns", True)
+            else:
+                options.set_preference("network.proxy.http", proxy.hostname)
+                options.set_preference("network.proxy.http_port", proxy.port)
+                options.set_preference("network.proxy.ssl", proxy.hostname)
+                options.set_preference("network.proxy.ssl_port", proxy.port)
+
+        # native network: images and fonts are blocked by preferences, other rules aren't supported.
+        if self.network_native and self.rules:
+            if "image" in self.request.block_types:
+                options.set_preference("permissions.default.image", 2)
+            if "font" in self.request.block_types:
+                options.set_preference("browser.display.use_document_fonts", 0)
+
+            unsupported = [t for t in self.request.block_types if t not in ["font", "image"]]
+            if unsupported or self.request.block_urls:
+                logger.warning("[{}][{}] Blocking rules aren't supported by native network: {}".format(
+                    self.request.client_id, self.task_hash, unsupported + list(self.request.block_urls)))
+
         # add user-defined arguments.
         for argument in self.request.browser.argument:
             try:
@@ -724,19 +1206,26 @@ class FirefoxGenericBrowser(GenericBrowser):
         log = os.path.join(self.profile_dir, "geckodriver.log")
 
         try:
-            self.browser = webdriver.Firefox(
-                options=options,
-                service=FirefoxService(
-                    executable_path=FIREFOX_GECKODRIVER_WRAPPER,
-                    log_output=log,
-                    service_args=[
-                        "--log", self.config.params.default.log_level.lower(),
-                        self.config.params.default.firefox_driver_path,
-                        self.profile_dir
-                    ]
-                ),
-                seleniumwire_options=self.selenium_wire_options,
+            service = FirefoxService(
+                executable_path=FIREFOX_GECKODRIVER_WRAPPER,
+                log_output=log,
+                service_args=[
+                    "--log", self.config.params.default.log_level.lower(),
+                    self.config.params.default.firefox_driver_path,
+                    self.profile_dir
+                ],
+                env=self.display_env()
             )
+
+            with self.phase("browser_launch"):
+                if self.network_native:
+                    self.browser = native_webdriver.Firefox(options=options, service=service)
+                else:
+                    self.browser = webdriver.Firefox(
+                        options=options,
+                        service=service,
+                        seleniumwire_options=self.selenium_wire_options,
+                    )
         except WebDriverException as e:
             logger.error("[{}][{}] Cannot create browser: {}".format(
                 self.request.client_id, self.task_hash, e))
@@ -752,6 +1241,11 @@ class FirefoxGenericBrowser(GenericBrowser):
                     self.request.client_id, self.task_hash, extension.strip(), e))
                 continue
 
+        # record documents, block requests.
+        if not self.network_native:
+            self.browser.request_interceptor = self.block
+            self.browser.response_interceptor = self.capture
+
         # set geometry.
         self.browser.set_window_size(self.x, self.y)
 
@@ -761,11 +1255,50 @@ class FirefoxGenericBrowser(GenericBrowser):
 
         return True
 
-    def process(self, urls, cookies, screenshots, scripts) -> dict:
-        if self.create_browser():
-            return self.fetch(urls, cookies, screenshots, scripts)
-        else:
-            return {}
-
     def __del__(self):
         super(FirefoxGenericBrowser, self).__del__()
+
+
+class FakeGenericBrowser(GenericBrowser):
+    # Browser without browser and display (see FakeDriver), for load testing of the server.
+    poolable = True
+
+    def __init__(self, config, request, task_hash, stream):
+        super().__init__(config, request, task_hash, stream)
+
+    def create_browser(self) -> bool:
+        with self.phase("browser_launch"):
+            time.sleep(self.config.params.default.fake_launch_delay / 1000)
+
+            self.browser = FakeDriver(
+                self.config.params.default.fake_page_size,
+                self.config.params.default.fake_latency_min / 1000,
+                self.config.params.default.fake_latency_max / 1000,
+                self.config.params.default.fake_failure_rate / 100,
+                self.config.params.default.fake_status_codes,
+                self.config.params.default.fake_fetch
+            )
+
+        # record documents, block requests.
+        if not self.network_native:
+            self.browser.request_interceptor = self.block
+            self.browser.response_interceptor = self.capture
+
+        # set geometry.
+        self.browser.set_window_size(self.x, self.y)
+
+        # set timeouts.
+        self.browser.set_page_load_timeout(self.request.page_timeout)
+        self.browser.set_script_timeout(self.request.script_timeout)
+
+        return True
+
+    def __del__(self):
+        super(FakeGenericBrowser, self).__del__()
+
+
+BROWSERS = {
+    "chrome": ChromeGenericBrowser,
+    "fake": FakeGenericBrowser,
+    "firefox": FirefoxGenericBrowser,
+}
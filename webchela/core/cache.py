@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+import webchela.core.metrics as metrics
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.browser import browser_key
+
+logger = logging.getLogger("webchela.server.cache")
+
+
+def result_key(config, request, item) -> str:
+    # Url and everything that affects its result.
+    data = [
+        browser_key(config, request),
+        request.page_size,
+        request.page_body_raw,
+        list(request.block_urls),
+        item.url,
+        item.cookie,
+        item.screenshot,
+        request.screenshot_format,
+        request.screenshot_quality,
+        request.screenshot_max_width,
+        request.screenshot_max_height,
+        item.script,
+    ]
+
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+class ResultCache:
+    # Process-wide cache of finished results.
+    #
+    # Results are kept serialized in memory, up to "cache_size" bytes in total, the least recently
+    # used result gives way to a new one. Cached result is served if it's not older than task
+    # "cache_max_age". Only successfully loaded pages are cached. Cache with "cache_size = 0" is disabled.
+
+    def __init__(self, config):
+        self.size_max = config.params.server.cache_size
+
+        self.lock = Lock()
+        self.entries = OrderedDict()  # key -> (store time, serialized result).
+        self.size = 0  # total size of serialized results.
+
+        self.hits = 0
+        self.misses = 0
+
+    def enabled(self, request) -> bool:
+        return self.size_max > 0 and request.cache_max_age > 0
+
+    def get(self, key, max_age):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry and monotonic() - entry[0] <= max_age:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                data = entry[1]
+            else:
+                self.misses += 1
+                metrics.cache_misses.inc()
+                return None
+
+        metrics.cache_hits.inc()
+
+        return webchela_pb2.Result.FromString(data)
+
+    def put(self, key, result, data=None):
+        # "data" - serialized result, if it's already at hand.
+        if not 200 <= result.status_code < 400:
+            return
+
+        if data is None:
+            data = result.SerializeToString()
+
+        if len(data) > self.size_max:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key)[1])
+
+            while self.entries and self.size + len(data) > self.size_max:
+                _, (_, expired) = self.entries.popitem(last=False)
+                self.size -= len(expired)
+
+            self.entries[key] = (monotonic(), data)
+            self.size += len(data)
+
+            metrics.cache_entries.set(len(self.entries))
+            metrics.cache_size.set(self.size)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,51 @@
+import gzip
+import logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("webchela.server.compression")
+
+# Compression of serialized results: method -> default level.
+COMPRESSIONS = {
+    "gzip": 6,
+    "zstd": 3,
+}
+
+# Method -> range of levels.
+COMPRESSION_LEVELS = {
+    "gzip": (1, 9),
+    "zstd": (1, 22),
+}
+
+
+def compression_method(method) -> str:
+    # zstd is optional (zstandard package), gzip is used instead.
+    if method == "zstd" and zstandard is None:
+        return "gzip"
+
+    return method
+
+
+def compress(data, method, level=0) -> bytes:
+    level = level or COMPRESSIONS[method]
+
+    if method == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    raise ValueError("unknown compression: {}".format(method))
+
+
+def decompress(data, method) -> bytes:
+    if method == "gzip":
+        return gzip.decompress(data)
+
+    if method == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    return data
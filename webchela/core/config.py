@@ -7,18 +7,28 @@ import psutil
 import sys
 import toml
 
+from webchela.core.compression import compression_method
 from webchela.core.utils import human_size
 
 from webchela.core.validate import (
+    is_block_types,
     is_bool,
     is_browser_geometry,
+    is_browser_network,
     is_browser_type,
     is_bytes,
+    is_client_values,
+    is_compression,
+    is_compression_level,
     is_dir,
     is_file,
+    is_grpc_compression,
     is_int,
     is_list,
+    is_load_event,
     is_log_level,
+    is_screenshot_format,
+    is_server_mode,
     is_string,
     is_tab_open_randomize,
 )
@@ -29,6 +39,13 @@ from webchela.core.vars import (
     CHROME_PATH, CHROME_PROFILE,
     CHROME_PROFILES_DIR,
 
+    FAKE_FAILURE_RATE,
+    FAKE_FETCH,
+    FAKE_LATENCY,
+    FAKE_LAUNCH_DELAY,
+    FAKE_PAGE_SIZE,
+    FAKE_STATUS_CODES,
+
     FIREFOX_DRIVER_PATH,
     FIREFOX_EXTENSIONS_DIR,
     FIREFOX_PATH,
@@ -40,8 +57,10 @@ from webchela.core.vars import (
     DEFAULT_BROWSER_ARGUMENT,
     DEFAULT_BROWSER_EXTENSION,
     DEFAULT_BROWSER_GEOMETRY,
+    DEFAULT_BROWSER_HEADLESS,
     DEFAULT_BROWSER_INSTANCE,
     DEFAULT_BROWSER_INSTANCE_TAB,
+    DEFAULT_BROWSER_NETWORK,
     DEFAULT_BROWSER_PROXY,
     DEFAULT_BROWSER_RETRY_CODES,
     DEFAULT_BROWSER_RETRY_CODES_TRIES,
@@ -55,24 +74,52 @@ from webchela.core.vars import (
     DEFAULT_DEBUG_PRE_SCRIPT_DELAY,
     DEFAULT_DEBUG_PRE_WAIT_DELAY,
 
+    DEFAULT_BLOCK_TYPES,
+    DEFAULT_BLOCK_URLS,
+    DEFAULT_CACHE_MAX_AGE,
     DEFAULT_CHUNK_SIZE,
+    DEFAULT_COMPRESSION,
+    DEFAULT_COMPRESSION_LEVEL,
     DEFAULT_CPU_LOAD,
     DEFAULT_KEEP_TEMP,
     DEFAULT_LOG_FORMAT,
     DEFAULT_LOG_LEVEL,
+    DEFAULT_LOAD_EVENT,
     DEFAULT_MEM_FREE,
+    DEFAULT_PAGE_BODY_RAW,
     DEFAULT_PAGE_SIZE,
     DEFAULT_PAGE_TIMEOUT,
     DEFAULT_PARAMS,
     DEFAULT_RETRY_CODES,
     DEFAULT_RETRY_CODES_TRIES,
+    DEFAULT_SCREENSHOT_FORMAT,
+    DEFAULT_SCREENSHOT_MAX_HEIGHT,
+    DEFAULT_SCREENSHOT_MAX_WIDTH,
+    DEFAULT_SCREENSHOT_QUALITY,
     DEFAULT_SCREENSHOT_TIMEOUT,
     DEFAULT_SCRIPT_TIMEOUT,
     DEFAULT_SHM_SIZE,
+    DEFAULT_STREAM_BUFFER,
+    DEFAULT_STREAM_UNORDERED,
     DEFAULT_TAB_OPEN_RANDOMIZE,
+    DEFAULT_TAB_PIPELINE,
     DEFAULT_TASK_TIMEOUT,
 
+    DEFAULT_SERVER_CACHE_SIZE,
+    DEFAULT_SERVER_CLIENT_SLOTS,
+    DEFAULT_SERVER_CLIENT_WEIGHT,
+    DEFAULT_SERVER_DISPLAY_POOL_SIZE,
+    DEFAULT_SERVER_GRPC_COMPRESSION,
     DEFAULT_SERVER_LISTEN,
+    DEFAULT_SERVER_LOAD_INTERVAL,
+    DEFAULT_SERVER_LOAD_WINDOW,
+    DEFAULT_SERVER_METRICS_LISTEN,
+    DEFAULT_SERVER_MODE,
+    DEFAULT_SERVER_POOL_IDLE_TIMEOUT,
+    DEFAULT_SERVER_POOL_SIZE_MAX,
+    DEFAULT_SERVER_POOL_SIZE_MIN,
+    DEFAULT_SERVER_SCREENSHOT_WORKERS,
+    DEFAULT_SERVER_SLOTS,
     DEFAULT_SERVER_WORKERS,
 )
 
@@ -197,6 +244,9 @@ class Config:
             self._params["default"]["browser_geometry_y"] = is_browser_geometry(
             "default.browser_geometry", self._params["default"]["browser_geometry"], DEFAULT_BROWSER_GEOMETRY)
 
+        self._params["default"]["browser_headless"] = is_bool(
+            "default.browser_headless", self._params["default"]["browser_headless"], DEFAULT_BROWSER_HEADLESS)
+
         self._params["default"]["browser_instance"] = is_int(
             "default.browser_instance", self._params["default"]["browser_instance"], DEFAULT_BROWSER_INSTANCE)
 
@@ -204,6 +254,9 @@ class Config:
             "default.browser_instance_tab", self._params["default"]["browser_instance_tab"],
             DEFAULT_BROWSER_INSTANCE_TAB)
 
+        self._params["default"]["browser_network"] = is_browser_network(
+            "default.browser_network", self._params["default"]["browser_network"], DEFAULT_BROWSER_NETWORK)
+
         self._params["default"]["browser_proxy"] = is_string(
             "default.browser_proxy", self._params["default"]["browser_proxy"], DEFAULT_BROWSER_PROXY)
 
@@ -231,9 +284,25 @@ class Config:
         self._params["default"]["chrome_profiles_dir"] = is_dir(
             "default.chrome_profiles_dir", self._params["default"]["chrome_profiles_dir"], CHROME_PROFILES_DIR)
 
+        self._params["default"]["block_types"] = is_block_types(
+            "default.block_types", self._params["default"]["block_types"], DEFAULT_BLOCK_TYPES)
+
+        self._params["default"]["block_urls"] = is_list(
+            "default.block_urls", self._params["default"]["block_urls"], DEFAULT_BLOCK_URLS)
+
+        self._params["default"]["cache_max_age"] = is_int(
+            "default.cache_max_age", self._params["default"]["cache_max_age"], DEFAULT_CACHE_MAX_AGE)
+
         self._params["default"]["chunk_size"] = is_bytes(
             "default.chunk_size", self._params["default"]["chunk_size"], DEFAULT_CHUNK_SIZE)
 
+        self._params["default"]["compression"] = is_compression(
+            "default.compression", self._params["default"]["compression"], DEFAULT_COMPRESSION)
+
+        self._params["default"]["compression_level"] = is_compression_level(
+            "default.compression_level", self._params["default"]["compression_level"],
+            compression_method(self._params["default"]["compression"]), DEFAULT_COMPRESSION_LEVEL)
+
         self._params["default"]["cpu_load"] = is_int(
             "default.cpu_load", self._params["default"]["cpu_load"], DEFAULT_CPU_LOAD)
 
@@ -265,6 +334,26 @@ class Config:
             "default.debug_pre_wait_delay", self._params["default"]["debug_pre_wait_delay"],
             DEFAULT_DEBUG_PRE_WAIT_DELAY)
 
+        self._params["default"]["fake_failure_rate"] = is_int(
+            "default.fake_failure_rate", self._params["default"]["fake_failure_rate"], FAKE_FAILURE_RATE)
+
+        self._params["default"]["fake_fetch"] = is_bool(
+            "default.fake_fetch", self._params["default"]["fake_fetch"], FAKE_FETCH)
+
+        self._params["default"]["fake_latency"], \
+            self._params["default"]["fake_latency_min"], \
+            self._params["default"]["fake_latency_max"] = is_tab_open_randomize(
+            "default.fake_latency", self._params["default"]["fake_latency"], FAKE_LATENCY)
+
+        self._params["default"]["fake_launch_delay"] = is_int(
+            "default.fake_launch_delay", self._params["default"]["fake_launch_delay"], FAKE_LAUNCH_DELAY)
+
+        self._params["default"]["fake_page_size"] = is_bytes(
+            "default.fake_page_size", self._params["default"]["fake_page_size"], FAKE_PAGE_SIZE)
+
+        self._params["default"]["fake_status_codes"] = is_list(
+            "default.fake_status_codes", self._params["default"]["fake_status_codes"], FAKE_STATUS_CODES)
+
         self._params["default"]["firefox_driver_path"] = is_file(
             "default.firefox_driver_path", self._params["default"]["firefox_driver_path"], FIREFOX_DRIVER_PATH)
 
@@ -284,9 +373,15 @@ class Config:
         self._params["default"]["keep_temp"] = is_bool(
             "default.keep_temp", self._params["default"]["keep_temp"], DEFAULT_KEEP_TEMP)
 
+        self._params["default"]["load_event"] = is_load_event(
+            "default.load_event", self._params["default"]["load_event"], DEFAULT_LOAD_EVENT)
+
         self._params["default"]["mem_free"] = is_bytes(
             "default.mem_free", self._params["default"]["mem_free"], DEFAULT_MEM_FREE)
 
+        self._params["default"]["page_body_raw"] = is_bool(
+            "default.page_body_raw", self._params["default"]["page_body_raw"], DEFAULT_PAGE_BODY_RAW)
+
         self._params["default"]["page_size"] = is_bytes(
             "default.page_size", self._params["default"]["page_size"], DEFAULT_PAGE_SIZE)
 
@@ -299,6 +394,20 @@ class Config:
         self._params["default"]["retry_codes_tries"] = is_int(
             "default.retry_codes_tries", self._params["default"]["retry_codes_tries"], DEFAULT_RETRY_CODES_TRIES)
 
+        self._params["default"]["screenshot_format"] = is_screenshot_format(
+            "default.screenshot_format", self._params["default"]["screenshot_format"], DEFAULT_SCREENSHOT_FORMAT)
+
+        self._params["default"]["screenshot_max_height"] = is_int(
+            "default.screenshot_max_height", self._params["default"]["screenshot_max_height"],
+            DEFAULT_SCREENSHOT_MAX_HEIGHT)
+
+        self._params["default"]["screenshot_max_width"] = is_int(
+            "default.screenshot_max_width", self._params["default"]["screenshot_max_width"],
+            DEFAULT_SCREENSHOT_MAX_WIDTH)
+
+        self._params["default"]["screenshot_quality"] = is_int(
+            "default.screenshot_quality", self._params["default"]["screenshot_quality"], DEFAULT_SCREENSHOT_QUALITY)
+
         self._params["default"]["screenshot_timeout"] = is_int(
             "default.screenshot_timeout", self._params["default"]["screenshot_timeout"],
             DEFAULT_SCREENSHOT_TIMEOUT)
@@ -306,18 +415,72 @@ class Config:
         self._params["default"]["script_timeout"] = is_int(
             "default.script_timeout", self._params["default"]["script_timeout"], DEFAULT_SCRIPT_TIMEOUT)
 
+        self._params["default"]["stream_buffer"] = is_int(
+            "default.stream_buffer", self._params["default"]["stream_buffer"], DEFAULT_STREAM_BUFFER)
+
+        self._params["default"]["stream_unordered"] = is_bool(
+            "default.stream_unordered", self._params["default"]["stream_unordered"], DEFAULT_STREAM_UNORDERED)
+
         self._params["default"]["tab_open_randomize"], \
             self._params["default"]["tab_open_randomize_min"], \
             self._params["default"]["tab_open_randomize_max"] = is_tab_open_randomize(
             "default.tab_open_randomize", self._params["default"]["tab_open_randomize"],
             DEFAULT_TAB_OPEN_RANDOMIZE)
 
+        self._params["default"]["tab_pipeline"] = is_bool(
+            "default.tab_pipeline", self._params["default"]["tab_pipeline"], DEFAULT_TAB_PIPELINE)
+
         self._params["default"]["task_timeout"] = is_int(
             "default.task_timeout", self._params["default"]["task_timeout"], DEFAULT_TASK_TIMEOUT)
 
         # Server.
+        self._params["server"]["cache_size"] = is_bytes(
+            "server.cache_size", self._params["server"]["cache_size"], DEFAULT_SERVER_CACHE_SIZE)
+
+        self._params["server"]["client_slots"] = is_client_values(
+            "server.client_slots", self._params["server"]["client_slots"], DEFAULT_SERVER_CLIENT_SLOTS)
+
+        self._params["server"]["client_weight"] = is_client_values(
+            "server.client_weight", self._params["server"]["client_weight"], DEFAULT_SERVER_CLIENT_WEIGHT)
+
+        self._params["server"]["display_pool_size"] = is_int(
+            "server.display_pool_size", self._params["server"]["display_pool_size"],
+            DEFAULT_SERVER_DISPLAY_POOL_SIZE)
+
+        self._params["server"]["grpc_compression"] = is_grpc_compression(
+            "server.grpc_compression", self._params["server"]["grpc_compression"], DEFAULT_SERVER_GRPC_COMPRESSION)
+
         self._params["server"]["listen"] = is_string(
             "server.listen", self._params["server"]["listen"], DEFAULT_SERVER_LISTEN)
 
+        self._params["server"]["load_interval"] = is_int(
+            "server.load_interval", self._params["server"]["load_interval"], DEFAULT_SERVER_LOAD_INTERVAL)
+
+        self._params["server"]["load_window"] = is_int(
+            "server.load_window", self._params["server"]["load_window"], DEFAULT_SERVER_LOAD_WINDOW)
+
+        self._params["server"]["metrics_listen"] = is_string(
+            "server.metrics_listen", self._params["server"]["metrics_listen"], DEFAULT_SERVER_METRICS_LISTEN)
+
+        self._params["server"]["mode"] = is_server_mode(
+            "server.mode", self._params["server"]["mode"], DEFAULT_SERVER_MODE)
+
+        self._params["server"]["pool_idle_timeout"] = is_int(
+            "server.pool_idle_timeout", self._params["server"]["pool_idle_timeout"],
+            DEFAULT_SERVER_POOL_IDLE_TIMEOUT)
+
+        self._params["server"]["pool_size_max"] = is_int(
+            "server.pool_size_max", self._params["server"]["pool_size_max"], DEFAULT_SERVER_POOL_SIZE_MAX)
+
+        self._params["server"]["pool_size_min"] = is_int(
+            "server.pool_size_min", self._params["server"]["pool_size_min"], DEFAULT_SERVER_POOL_SIZE_MIN)
+
+        self._params["server"]["screenshot_workers"] = is_int(
+            "server.screenshot_workers", self._params["server"]["screenshot_workers"],
+            DEFAULT_SERVER_SCREENSHOT_WORKERS)
+
+        self._params["server"]["slots"] = is_int(
+            "server.slots", self._params["server"]["slots"], DEFAULT_SERVER_SLOTS)
+
         self._params["server"]["workers"] = is_int(
             "server.workers", self._params["server"]["workers"], DEFAULT_SERVER_WORKERS)
@@ -0,0 +1,142 @@
+import logging
+import os
+
+from pyvirtualdisplay import Display
+from threading import Lock, Thread
+
+from webchela.core.validate import is_browser_geometry
+from webchela.core.vars import DEFAULT_BROWSER_GEOMETRY
+
+logger = logging.getLogger("webchela.server.display")
+
+
+def start_display(size) -> Display:
+    # DISPLAY isn't set globally (displays are used in parallel), browsers get it with their drivers.
+    display = Display(backend="xvnc", size=size, rfbport=0, manage_global_env=False)
+    display.start()
+
+    return display
+
+
+def display_healthy(display) -> bool:
+    try:
+        return display.is_alive() and os.path.exists("/tmp/.X11-unix/X{}".format(display.display))
+    except Exception:
+        return False
+
+
+class DisplayPool:
+    # Process-wide pool of long-lived virtual displays (Xvnc), every display hosts one browser at time.
+    #
+    # "display_pool_size" displays are started in background with default geometry. Released displays
+    # are health-checked and kept for next browsers, an idle display of other geometry is restarted
+    # only if there is no room for a new one. Browsers get a private display if all pooled displays
+    # are busy. Pool with "display_pool_size = 0" only starts and stops displays.
+
+    def __init__(self, config):
+        self.size_max = config.params.server.display_pool_size
+
+        self.lock = Lock()
+        self.idle = []  # list of (display, size).
+        self.leased = {}  # display -> size.
+        self.started = 0  # pooled displays (idle, leased and starting).
+
+        _, x, y = is_browser_geometry("", config.params.default.browser_geometry, DEFAULT_BROWSER_GEOMETRY)
+
+        if self.size_max > 0:
+            Thread(target=self._warm, args=((int(x), int(y)),), name="display-pool", daemon=True).start()
+
+    def lease(self, size) -> Display:
+        display = None
+        pooled = False
+        stale = None
+
+        with self.lock:
+            for index, (idle, idle_size) in enumerate(self.idle):
+                if idle_size == size:
+                    display = self.idle.pop(index)[0]
+                    self.leased[display] = size
+                    break
+
+            else:
+                if self.idle and self.started >= self.size_max:
+                    stale = self.idle.pop(0)[0]
+                    self.started -= 1
+
+                if self.started < self.size_max:
+                    self.started += 1
+                    pooled = True
+
+        if stale:
+            self._stop(stale)
+
+        if display:
+            if display_healthy(display):
+                return display
+
+            logger.warning("Virtual display is dead: {}".format(display.new_display_var))
+            self.release(display)
+
+            return self.lease(size)
+
+        try:
+            display = start_display(size)
+        except Exception:
+            if pooled:
+                with self.lock:
+                    self.started -= 1
+            raise
+
+        if pooled:
+            with self.lock:
+                self.leased[display] = size
+
+        return display
+
+    def release(self, display):
+        with self.lock:
+            size = self.leased.pop(display, None)
+
+        # private display.
+        if size is None:
+            self._stop(display)
+            return
+
+        if display_healthy(display):
+            with self.lock:
+                self.idle.append((display, size))
+        else:
+            self._stop(display)
+
+            with self.lock:
+                self.started -= 1
+
+    def _stop(self, display):
+        try:
+            display.stop()
+        except Exception as e:
+            logger.error("Cannot stop virtual display properly: {}".format(e))
+
+    def _warm(self, size):
+        # Start pooled displays ahead of browsers.
+        while True:
+            with self.lock:
+                if self.started >= self.size_max:
+                    return
+
+                self.started += 1
+
+            try:
+                display = start_display(size)
+            except Exception as e:
+                logger.warning("Cannot create virtual display: {}".format(e))
+
+                with self.lock:
+                    self.started -= 1
+
+                return
+
+            logger.debug("Virtual display is started: {}".format(display.new_display_var))
+
+            with self.lock:
+                self.idle.append((display, size))
@@ -0,0 +1,286 @@
+import base64
+import random
+
+from collections import deque
+
+from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+from threading import Lock, Thread
+from time import monotonic, sleep
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from webchela.core.vars import DEFAULT_CAPTURE_STORAGE_SIZE
+from webchela.core.vars import (
+    SCRIPT_NAVIGATION,
+    SCRIPT_PAGE_CAPTURE,
+    SCRIPT_PAGE_EVENT,
+    SCRIPT_PAGE_HEIGHT,
+    SCRIPT_PAGE_WIDTH,
+    SCRIPT_READY_STATE,
+    SCRIPT_RELOAD,
+    SCRIPT_SCROLL_INTO_VIEW,
+    SCRIPT_STOP,
+    SCRIPT_TAB_OPEN,
+)
+
+# 1x1 transparent png.
+FAKE_SCREENSHOT = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360606060000000050001a5f645400000000049454e44ae426082")).decode()
+
+
+class FakeResponse:
+    def __init__(self, status_code, content_type):
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+
+
+class FakeRequest:
+    # Captured request (see GenericBrowser.capture).
+    def __init__(self, url, status_code):
+        self.url = url
+        self.headers = {"Sec-Fetch-Dest": "document"}
+        self.response = FakeResponse(status_code, "text/html; charset=utf-8")
+
+
+class FakeElement:
+    def __init__(self, driver):
+        self.driver = driver
+        self.rect = {"x": 0, "y": 0, "width": 1, "height": 1}
+
+    @property
+    def screenshot_as_base64(self):
+        self.driver.check()
+        return FAKE_SCREENSHOT
+
+    @property
+    def screenshot_as_png(self):
+        return base64.b64decode(self.screenshot_as_base64)
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.check()
+
+        if handle not in self.driver.tabs:
+            raise NoSuchWindowException("no such window: {}".format(handle))
+
+        self.driver.current = handle
+
+
+class FakeTab:
+    def __init__(self, url, latency):
+        self.url = url
+        self.body = None  # fetched page body (fetch mode).
+        self.status_code = 0  # navigation timing (native network).
+        self.ready_at = monotonic() + latency
+
+
+class FakeDriver:
+    # In-process webdriver for load testing of the server without browsers and displays.
+    #
+    # Implements webdriver calls used by GenericBrowser. Pages are "loaded" after random latency,
+    # page body is generated with configured size, status code is chosen randomly from configured codes,
+    # any call of a page might fail with configured probability (browser error).
+    # In fetch mode pages are loaded over http (without scripts and subresources), latency is added
+    # to the real loading time, page body and status code are real.
+
+    def __init__(self, page_size, latency_min, latency_max, failure_rate, status_codes, fetch=False):
+        self.page_size = page_size
+        self.latency_min = latency_min
+        self.latency_max = latency_max
+        self.failure_rate = failure_rate
+        self.status_codes = status_codes
+        self.fetch = fetch
+
+        self.lock = Lock()
+        self.handles = 0
+        self.tabs = {"blank": FakeTab("about:blank", 0)}
+        self.current = "blank"
+        self.captured = deque(maxlen=DEFAULT_CAPTURE_STORAGE_SIZE)
+        self.response_interceptor = None
+
+        self.switch_to = FakeSwitchTo(self)
+
+    # ------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def current_url(self):
+        self.check()
+        return self.tabs[self.current].url
+
+    @property
+    def page_source(self):
+        self.check(fail=True)
+
+        if self.tabs[self.current].body is not None:
+            return self.tabs[self.current].body
+
+        body = "<html><head><title>{}</title></head><body>".format(self.current_url)
+        return body + "x" * max(self.page_size - len(body) - len("</body></html>"), 0) + "</body></html>"
+
+    @property
+    def requests(self):
+        with self.lock:
+            return list(self.captured)
+
+    @requests.deleter
+    def requests(self):
+        with self.lock:
+            self.captured.clear()
+
+    @property
+    def title(self):
+        return self.current_url
+
+    @property
+    def window_handles(self):
+        self.check()
+        return list(self.tabs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def add_cookie(self, cookie):
+        self.check()
+
+    def capture(self, request):
+        with self.lock:
+            self.captured.append(request)
+
+        if self.response_interceptor:
+            self.response_interceptor(request, request.response)
+
+    def check(self, fail=False):
+        # Session is gone or random browser error.
+        if self.tabs is None:
+            raise WebDriverException("invalid session id")
+
+        if fail and random.random() < self.failure_rate:
+            raise WebDriverException("fake browser error")
+
+    def close(self):
+        self.check()
+
+        if len(self.tabs) > 1:
+            del self.tabs[self.current]
+
+    def delete_all_cookies(self):
+        self.check()
+
+    def execute_script(self, script, *args):
+        self.check()
+
+        if script == SCRIPT_TAB_OPEN:
+            self.open(args[0])
+
+        elif script == SCRIPT_READY_STATE:
+            tab = self.tabs[self.current]
+            return ["complete" if monotonic() >= tab.ready_at else "loading", tab.url]
+
+        elif script == SCRIPT_STOP:
+            self.tabs[self.current].ready_at = 0
+
+        elif script == SCRIPT_RELOAD:
+            self.load(self.current, self.tabs[self.current].url)
+
+        elif script == SCRIPT_NAVIGATION:
+            tab = self.tabs[self.current]
+            return [tab.url, tab.status_code, "text/html"]
+
+        elif script == SCRIPT_PAGE_CAPTURE:
+            page = self.page_source
+            size = len(page.encode())
+            return [self.current_url, self.title, size, "" if size > args[0] else page]
+
+        elif script == SCRIPT_PAGE_HEIGHT or script == SCRIPT_PAGE_WIDTH:
+            return 1000
+
+        elif script == SCRIPT_SCROLL_INTO_VIEW:
+            return None
+
+        # user scripts.
+        else:
+            self.check(fail=True)
+            return "fake"
+
+    def execute_async_script(self, script, *args):
+        self.check()
+
+        # page event is "fired" when page is loaded.
+        if script == SCRIPT_PAGE_EVENT:
+            tab = self.tabs[self.current]
+            sleep(max(min(tab.ready_at - monotonic(), args[1] / 1000), 0))
+
+            reached = monotonic() >= tab.ready_at
+            return [reached, tab.url, "complete" if reached else "loading"]
+
+        return self.execute_script(script, *args)
+
+    def find_elements(self, by, value):
+        self.check()
+        return [FakeElement(self)]
+
+    def get(self, url):
+        self.check()
+        self.load(self.current, url)
+        self.tabs[self.current].ready_at = 0
+
+    def implicitly_wait(self, timeout):
+        self.check()
+
+    def fetch_tab(self, tab, latency):
+        try:
+            with urlopen(tab.url, timeout=60) as response:
+                status_code = response.status
+                body = response.read()
+                tab.url = response.geturl()
+
+        except HTTPError as e:
+            status_code = e.code
+            body = e.read()
+
+        # browser shows its error page, nothing is captured.
+        except (OSError, ValueError) as e:
+            tab.body = "<html><body>{}</body></html>".format(e)
+            tab.ready_at = monotonic() + latency
+            return
+
+        self.capture(FakeRequest(tab.url, status_code))
+
+        tab.status_code = status_code
+        tab.body = body.decode(errors="replace")
+        tab.ready_at = monotonic() + latency
+
+    def load(self, handle, url):
+        latency = random.uniform(self.latency_min, self.latency_max)
+        tab = self.tabs[handle] = FakeTab(url, latency)
+
+        if url == "about:blank":
+            return
+
+        if self.fetch:
+            tab.ready_at = float("inf")
+            Thread(target=self.fetch_tab, args=(tab, latency), daemon=True).start()
+        else:
+            tab.status_code = random.choice(self.status_codes)
+            self.capture(FakeRequest(url, tab.status_code))
+
+    def open(self, url):
+        self.handles += 1
+        self.load("tab{}".format(self.handles), url)
+
+    def quit(self):
+        self.tabs = None
+
+    def set_page_load_timeout(self, timeout):
+        self.check()
+
+    def set_script_timeout(self, timeout):
+        self.check()
+
+    def set_window_size(self, width, height):
+        self.check()
+
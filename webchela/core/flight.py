@@ -0,0 +1,50 @@
+import logging
+
+from threading import Lock
+
+logger = logging.getLogger("webchela.server.flight")
+
+
+class FlightRegistry:
+    # Process-wide registry of urls being loaded right now.
+    #
+    # Identical urls (see result_key) of all tasks are loaded once: the first queue leads the url,
+    # later queues follow it and get a copy of the leader's result. If the leader's task is gone
+    # before the url is loaded, the first active follower leads the url instead.
+
+    def __init__(self):
+        self.lock = Lock()
+        self.flights = {}  # key -> list of followers (queue, item).
+
+    def join(self, key, queue, item) -> bool:
+        # Return True if url is followed (result will be passed to queue), False if queue leads url.
+        with self.lock:
+            if key in self.flights:
+                self.flights[key].append((queue, item))
+                return True
+
+            self.flights[key] = []
+            return False
+
+    def land(self, key, result):
+        # Leader is done with url (result is None if url failed), pass result to followers.
+        with self.lock:
+            followers = self.flights.pop(key, [])
+
+        for queue, item in followers:
+            queue.receive(item, result)
+
+    def abort(self, key):
+        # Leader won't load url, hand it over.
+        while True:
+            with self.lock:
+                followers = self.flights.get(key)
+
+                if not followers:
+                    self.flights.pop(key, None)
+                    return
+
+                queue, item = followers.pop(0)
+
+            if queue.adopt(key, item):
+                return
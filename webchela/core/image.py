@@ -0,0 +1,109 @@
+import asyncio
+import io
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("webchela.server.image")
+
+# Screenshot format -> Pillow format.
+SCREENSHOT_FORMATS = {
+    "jpeg": "JPEG",
+    "png": "PNG",
+    "webp": "WEBP",
+}
+
+
+def screenshot_format(value) -> str:
+    # Screenshots are sent as captured (png) if Pillow isn't available.
+    if value and value != "png" and Image is None:
+        logger.warning("Pillow isn't available, screenshots are sent as png: {}".format(value))
+        return "png"
+
+    return value
+
+
+def encode_screenshot(png, fmt, quality, max_width, max_height) -> bytes:
+    if Image is None or (fmt == "png" and not max_width and not max_height):
+        return png
+
+    with Image.open(io.BytesIO(png)) as image:
+        # downscale with aspect ratio, images are never upscaled.
+        if max_width or max_height:
+            image.thumbnail((max_width or image.width, max_height or image.height))
+
+        if fmt == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        data = io.BytesIO()
+
+        if fmt == "png":
+            image.save(data, SCREENSHOT_FORMATS[fmt], optimize=True)
+        else:
+            image.save(data, SCREENSHOT_FORMATS[fmt], quality=quality)
+
+        return data.getvalue()
+
+
+class ScreenshotEncoder:
+    # Captured screenshots (png) are downscaled and encoded by workers (server.screenshot_workers),
+    # screenshots of a result are encoded in parallel, browsers don't wait for that.
+
+    def __init__(self, config):
+        self.executor = ThreadPoolExecutor(max_workers=config.params.server.screenshot_workers,
+                                           thread_name_prefix="screenshot")
+
+    def encode(self, request, task_hash, result):
+        futures = self.submit(request, result)
+
+        try:
+            screenshots = [future.result() for future in futures]
+        except Exception as e:
+            return self.encoded(request, task_hash, result, None, e)
+
+        return self.encoded(request, task_hash, result, screenshots)
+
+    async def encode_async(self, request, task_hash, result):
+        # Event loop isn't blocked while workers encode screenshots.
+        futures = self.submit(request, result)
+
+        try:
+            screenshots = await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+        except Exception as e:
+            return self.encoded(request, task_hash, result, None, e)
+
+        return self.encoded(request, task_hash, result, screenshots)
+
+    def submit(self, request, result) -> list:
+        return [
+            self.executor.submit(encode_screenshot, png, request.screenshot_format, request.screenshot_quality,
+                                 request.screenshot_max_width, request.screenshot_max_height)
+            for png in result.screenshots_binary
+        ]
+
+    def encoded(self, request, task_hash, result, screenshots, error=None):
+        # Result might be shared with other tasks (see FlightRegistry), encoded result is a copy.
+        if error is not None:
+            logger.warning("[{}][{}] Screenshots encoding error, screenshots are sent as png: {}, {}".format(
+                request.client_id, task_hash, result.url, error))
+
+            screenshots = list(result.screenshots_binary)
+            fmt = "png"
+        else:
+            fmt = request.screenshot_format
+
+        encoded = webchela_pb2.Result()
+        encoded.CopyFrom(result)
+        encoded.screenshot_format = fmt
+
+        del encoded.screenshots_binary[:]
+        encoded.screenshots_binary.extend(screenshots)
+
+        return encoded
@@ -0,0 +1,87 @@
+import logging
+import psutil
+
+from collections import deque
+from threading import Lock, Thread
+from time import sleep
+
+from webchela.core.vars import DEFAULT_CPU_FREQ
+
+logger = logging.getLogger("webchela.server.load")
+
+
+def get_cpu_freq():
+    # virtual cpus don't provide max frequency value, use static value.
+    try:
+        cpu_freq_max = int(psutil.cpu_freq().max)
+    except Exception:
+        cpu_freq_max = 0
+
+    return cpu_freq_max if cpu_freq_max != 0 else DEFAULT_CPU_FREQ
+
+
+def get_score(cpu_load, mem_free, cpu_count, cpu_freq):
+    cpu_score = cpu_count * cpu_freq / max(cpu_load, 1)
+
+    return int(cpu_score * mem_free / 1024 / 1024 / 1024)
+
+
+class Load:
+    def __init__(self, cpu_load, mem_free, score):
+        self.cpu_load = cpu_load
+        self.mem_free = mem_free
+        self.score = score
+
+
+class LoadSampler:
+    # Server workload is measured in background, readers get the latest values without waiting.
+    #
+    # "current" - the latest sample (interval resolution), is used for jobs admission.
+    # "average" - moving average over "window" samples, is exposed to clients.
+
+    def __init__(self, config):
+        self.interval = max(config.params.server.load_interval, 1)
+        self.samples = deque(maxlen=max(config.params.server.load_window, 1))
+
+        # static values.
+        self.cpu_count = psutil.cpu_count()
+        self.cpu_freq = get_cpu_freq()
+
+        self.lock = Lock()
+
+        # readers always get real values.
+        self._sample(0.1)
+
+        Thread(target=self._run, name="load-sampler", daemon=True).start()
+
+    def current(self) -> Load:
+        with self.lock:
+            return self.samples[-1]
+
+    def average(self) -> Load:
+        with self.lock:
+            samples = list(self.samples)
+
+        cpu_load = int(sum(s.cpu_load for s in samples) / len(samples))
+        mem_free = int(sum(s.mem_free for s in samples) / len(samples))
+
+        return Load(cpu_load, mem_free, get_score(cpu_load, mem_free, self.cpu_count, self.cpu_freq))
+
+    def _run(self):
+        while True:
+            try:
+                self._sample(self.interval)
+            except Exception as e:
+                logger.error("Cannot get server load: {}".format(e))
+                sleep(self.interval)
+
+    def _sample(self, interval):
+        # blocks for interval.
+        cpu_load = int(psutil.cpu_percent(interval=interval))
+        if cpu_load == 0:   # who might imagine that CPU load could be zero >_< (sarcasm).
+            cpu_load = 1
+
+        mem_free = int(psutil.virtual_memory().available)
+
+        with self.lock:
+            self.samples.append(Load(cpu_load, mem_free, get_score(cpu_load, mem_free, self.cpu_count, self.cpu_freq)))
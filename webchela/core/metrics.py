@@ -0,0 +1,218 @@
+import logging
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import monotonic
+
+from webchela.core.vars import DEFAULT_METRICS_BUCKETS
+
+logger = logging.getLogger("webchela.server.metrics")
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=""):
+    labels = ['{}="{}"'.format(name, escape(value)) for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+
+        self.lock = Lock()
+        self.values = {}  # label values -> value.
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = ["# HELP {} {}".format(self.name, self.description), "# TYPE {} counter".format(self.name)]
+
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append("{}{} {}".format(self.name, format_labels(self.labels, labels), value))
+
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+
+        self.lock = Lock()
+        self.values = {}  # label values -> value.
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def render(self) -> list:
+        lines = ["# HELP {} {}".format(self.name, self.description), "# TYPE {} gauge".format(self.name)]
+
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append("{}{} {}".format(self.name, format_labels(self.labels, labels), value))
+
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, labels, buckets=DEFAULT_METRICS_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+
+        self.lock = Lock()
+        self.values = {}  # label values -> [bucket counts..., sum, count].
+
+    def observe(self, value, *labels):
+        with self.lock:
+            data = self.values.get(labels)
+            if data is None:
+                data = self.values[labels] = [0] * (len(self.buckets) + 2)
+
+            for i, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    data[i] += 1
+
+            data[-2] += value
+            data[-1] += 1
+
+    def time(self, *labels):
+        return Timer(self, labels)
+
+    def render(self) -> list:
+        lines = ["# HELP {} {}".format(self.name, self.description), "# TYPE {} histogram".format(self.name)]
+
+        with self.lock:
+            for labels, data in sorted(self.values.items()):
+                for bucket, count in zip(self.buckets, data):
+                    lines.append("{}_bucket{} {}".format(
+                        self.name, format_labels(self.labels, labels, 'le="{}"'.format(bucket)), count))
+
+                lines.append("{}_bucket{} {}".format(
+                    self.name, format_labels(self.labels, labels, 'le="+Inf"'), data[-1]))
+                lines.append("{}_sum{} {}".format(self.name, format_labels(self.labels, labels), data[-2]))
+                lines.append("{}_count{} {}".format(self.name, format_labels(self.labels, labels), data[-1]))
+
+        return lines
+
+
+class Timer:
+    # Duration goes to histogram and task trace (if any).
+    def __init__(self, histogram, labels, trace=None, name=None, attrs=None):
+        self.histogram = histogram
+        self.labels = labels
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.started = monotonic()
+        return self
+
+    def __exit__(self, *_):
+        duration = monotonic() - self.started
+        self.histogram.observe(duration, *self.labels)
+
+        if self.trace is not None:
+            self.trace.add(self.name, self.started, duration, **self.attrs)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+blocked_requests = Counter(
+    "webchela_blocked_requests_total", "Requests blocked by task rules by kind: type, url.",
+    ["kind", "browser", "client_id"])
+
+cache_entries = Gauge(
+    "webchela_cache_entries", "Results kept in result cache.",
+    [])
+
+cache_hits = Counter(
+    "webchela_cache_hits_total", "Results served from result cache.",
+    [])
+
+cache_misses = Counter(
+    "webchela_cache_misses_total", "Results which were looked up in result cache and not found (or expired).",
+    [])
+
+cache_size = Gauge(
+    "webchela_cache_size_bytes", "Total size of serialized results kept in result cache.",
+    [])
+
+browser_crashes = Counter(
+    "webchela_browser_crashes_total", "Browsers which were found dead after processing urls.",
+    ["browser", "client_id"])
+
+page_size_exceeded = Counter(
+    "webchela_page_size_exceeded_total", "Pages which exceeded page size limit.",
+    ["browser", "client_id"])
+
+phase_seconds = Histogram(
+    "webchela_phase_seconds", "Duration of task phases.",
+    ["phase", "browser", "client_id"])
+
+retries = Counter(
+    "webchela_retries_total", "Pages which were reloaded because of status code (retry_codes).",
+    ["browser", "client_id"])
+
+timeouts = Counter(
+    "webchela_timeouts_total", "Timeouts by kind: page, script, wait, task.",
+    ["kind", "browser", "client_id"])
+
+METRICS = [blocked_requests, browser_crashes, cache_entries, cache_hits, cache_misses, cache_size, page_size_exceeded,
+           phase_seconds, retries, timeouts]
+
+
+def phase(name, request, trace=None, **attrs):
+    # with phase("tab_open", request): ...
+    return Timer(phase_seconds, (name, request.browser.type, request.client_id), trace, name, attrs)
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render().encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def serve(listen):
+    # Metrics are served in background: http://<listen>/metrics.
+    host, port = listen.rsplit(":", 1)
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+
+    logger.info("Metrics are served: http://{}/metrics".format(listen))
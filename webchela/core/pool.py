@@ -0,0 +1,208 @@
+import logging
+
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+import webchela.core.metrics as metrics
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.browser import BROWSERS, browser_key
+from webchela.core.display import DisplayPool
+from webchela.core.vars import DEFAULT_POOL_MAINTAIN_INTERVAL
+
+logger = logging.getLogger("webchela.server.pool")
+
+
+class BrowserPool:
+    # Process-wide pool of launched browsers.
+    #
+    # Browsers are grouped by settings which cannot be changed after launch (see browser_key):
+    # type, arguments, extensions, proxy and geometry. Released browsers are reset and kept idle
+    # (up to "pool_size_max" in total, the oldest idle browser gives way to a new one),
+    # idle browsers are closed after "pool_idle_timeout", but "pool_size_min" browsers
+    # are kept launched for every used settings. Pool with "pool_size_max = 0" only creates
+    # and destroys browsers. Browsers which cannot clear all site data of a task (see poolable)
+    # aren't reused, cookies and storage of one client mustn't leak to another.
+
+    def __init__(self, config):
+        self.config = config
+
+        self.size_max = config.params.server.pool_size_max
+        self.size_min = min(config.params.server.pool_size_min, self.size_max)
+        self.idle_timeout = config.params.server.pool_idle_timeout
+
+        self.displays = DisplayPool(config)
+
+        self.lock = Lock()
+        self.idle = {}  # key -> list of (browser, release time).
+        self.used = {}  # key -> request template.
+
+        if self.size_max > 0:
+            Thread(target=self._maintain, name="browser-pool", daemon=True).start()
+
+    def lease(self, request, task_hash, stream, job=None):
+        key = browser_key(self.config, request)
+        browser = None
+
+        # warm browsers are created from template, it has every field of browser_key.
+        template = webchela_pb2.Task(
+            browser=request.browser,
+            block_types=request.block_types,
+            block_urls=request.block_urls,
+            page_timeout=request.page_timeout,
+            script_timeout=request.script_timeout
+        )
+
+        with self.lock:
+            self.used[key] = template
+
+            if self.idle.get(key):
+                browser, _ = self.idle[key].pop()
+
+        if browser:
+            if browser.alive():
+                browser.bind(request, task_hash, stream)
+                browser.job = job
+
+                logger.debug("[{}][{}] Browser leased from pool: {}".format(
+                    request.client_id, task_hash, request.browser.type))
+
+                return browser
+
+            browser.destroy()
+
+        browser = BROWSERS[request.browser.type](self.config, request, task_hash, stream)
+        browser.displays = self.displays
+        browser.job = job
+
+        if browser.create_browser():
+            return browser
+
+        browser.destroy()
+
+        return None
+
+    def release(self, browser):
+        expired = None
+
+        if self.size_max > 0 and browser.poolable and browser.alive() and browser.reset():
+            with self.lock:
+                if self._idle_amount() >= self.size_max:
+                    expired = self._pop_oldest()
+
+                self.idle.setdefault(browser.key, []).append((browser, monotonic()))
+        else:
+            expired = browser
+
+        if expired:
+            expired.destroy()
+
+    def process(self, request, task_hash, stream, queue, queued, preempted=None):
+        # Process task urls while there are any, return amount of processed urls (None if browser isn't leased).
+        # "queued" - when job was queued (trace), "preempted" - returns True if job should give its browser slot
+        # back to other clients, job stops after current batch then (task queues a new job).
+        started = monotonic()
+
+        job = None
+        if stream.trace:
+            job = stream.trace.job()
+            stream.trace.add("queue_wait", queued, started - queued, job=job)
+
+        browser = self.lease(request, task_hash, stream, job)
+
+        if stream.trace:
+            stream.trace.add("lease", started, monotonic() - started, job=job, leased=browser is not None)
+
+        if not browser:
+            return None
+
+        processed = 0
+
+        try:
+            if request.tab_pipeline:
+                processed = browser.pipeline(queue, preempted)
+            else:
+                while True:
+                    items = queue.take(request.browser.instance_tab)
+                    if not items:
+                        break
+
+                    processed += browser.fetch(items)
+
+                    # Remaining urls will be taken by other instances.
+                    if not browser.alive():
+                        break
+
+                    if preempted and preempted():
+                        logger.debug("[{}][{}] Job gives browser slot back, other clients wait".format(
+                            request.client_id, task_hash))
+                        break
+
+            if not browser.alive():
+                logger.warning("[{}][{}] Browser is crashed: {}".format(
+                    request.client_id, task_hash, request.browser.type))
+                metrics.browser_crashes.inc(request.browser.type, request.client_id)
+
+            return processed
+
+        finally:
+            if stream.trace:
+                stream.trace.add("job", started, monotonic() - started, job=job, processed=processed)
+
+            self.release(browser)
+
+    def _idle_amount(self):
+        return sum(len(browsers) for browsers in self.idle.values())
+
+    def _pop_oldest(self):
+        key = min(self.idle, key=lambda k: self.idle[k][0][1])
+        browser, _ = self.idle[key].pop(0)
+
+        if not self.idle[key]:
+            del self.idle[key]
+
+        return browser
+
+    def maintain(self):
+        # Close expired idle browsers, launch browsers for used settings.
+        expired = []
+        warm = []
+
+        with self.lock:
+            now = monotonic()
+
+            for key in list(self.idle):
+                browsers = self.idle[key]
+                while len(browsers) > self.size_min and now - browsers[0][1] > self.idle_timeout:
+                    expired.append(browsers.pop(0)[0])
+
+                if not browsers:
+                    del self.idle[key]
+
+            for key, template in self.used.items():
+                if not BROWSERS[key[0]].poolable:
+                    continue
+
+                for _ in range(self.size_min - len(self.idle.get(key, []))):
+                    warm.append((key, template))
+
+            warm = warm[:max(self.size_max - self._idle_amount(), 0)]
+
+        for browser in expired:
+            logger.debug("Idle browser is closed: {}".format(browser.key[0]))
+            browser.destroy()
+
+        for key, template in warm:
+            browser = BROWSERS[key[0]](self.config, template, "pool", None)
+            browser.displays = self.displays
+            if browser.create_browser():
+                logger.debug("Idle browser is launched: {}".format(key[0]))
+
+                self.release(browser)
+            else:
+                browser.destroy()
+
+    def _maintain(self):
+        while True:
+            sleep(DEFAULT_POOL_MAINTAIN_INTERVAL)
+            self.maintain()
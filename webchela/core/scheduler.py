@@ -0,0 +1,205 @@
+import logging
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Thread
+from time import monotonic
+
+import webchela.core.metrics as metrics
+
+from webchela.core.utils import human_size
+from webchela.core.vars import (
+    DEFAULT_LOAD_RETRY_DELAY,
+    DEFAULT_SCHEDULER_REPORT_INTERVAL,
+    DEFAULT_SCHEDULER_WAIT_SAMPLES,
+)
+
+logger = logging.getLogger("webchela.server.scheduler")
+
+
+class Job:
+    def __init__(self, request, task_hash, fn, args):
+        self.request = request
+        self.task_hash = task_hash
+        self.fn = fn
+        self.args = args
+
+        self.future = Future()
+        self.queued = monotonic()
+
+
+class Scheduler:
+    # Server-wide browser slots.
+    #
+    # Jobs of all tasks are queued per client and started when a slot is free and workload limits
+    # of the job's task are good. Slots are shared between clients by their weights:
+    # the next job is taken from the client with the lowest "running jobs / weight",
+    # clients can be capped by amount of running jobs. Slots are applied when jobs start,
+    # so running jobs give their slots back between batches if other clients wait (see contended).
+
+    def __init__(self, config, load_sampler):
+        self.load_sampler = load_sampler
+
+        self.slots = config.params.server.slots
+        self.client_slots = vars(config.params.server.client_slots)  # config dicts are turned into Params.
+        self.client_weight = vars(config.params.server.client_weight)
+
+        self.cond = Condition()
+        self.queues = {}  # client_id -> deque of jobs.
+        self.running = {}  # client_id -> amount of running jobs.
+        self.waits = deque(maxlen=DEFAULT_SCHEDULER_WAIT_SAMPLES)  # recent queue wait times.
+
+        self.executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="browser")
+
+        Thread(target=self._dispatch, name="scheduler", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self.cond:
+            return {
+                "slots": self.slots,
+                "running": sum(self.running.values()),
+                "queued": sum(len(q) for q in self.queues.values()),
+                "wait_avg": sum(self.waits) / len(self.waits) if self.waits else 0,
+                "wait_max": max(self.waits) if self.waits else 0,
+            }
+
+    def contended(self, client_id) -> bool:
+        # Running job of client should give its slot back: all slots are busy and other client waits for a slot,
+        # that client has no running jobs or has less share even with the slot.
+        with self.cond:
+            if sum(self.running.values()) < self.slots:
+                return False
+
+            share = (self.running.get(client_id, 0) - 1) / self.client_weight.get(client_id, 1)
+
+            for job in self._candidates():
+                other = job.request.client_id
+                if other == client_id:
+                    continue
+
+                running = self.running.get(other, 0)
+                if running == 0 or (running + 1) / self.client_weight.get(other, 1) <= share:
+                    return True
+
+            return False
+
+    def submit(self, request, task_hash, fn, *args) -> Future:
+        # Future can be cancelled while job is queued.
+        job = Job(request, task_hash, fn, args)
+
+        with self.cond:
+            self.queues.setdefault(request.client_id, deque()).append(job)
+            self.cond.notify_all()
+
+        return job.future
+
+    def _candidates(self) -> list:
+        # Heads of client queues in order of fair share.
+        candidates = []
+
+        for client_id, queue in list(self.queues.items()):
+            while queue and queue[0].future.cancelled():
+                queue.popleft()
+
+            if not queue:
+                del self.queues[client_id]
+                continue
+
+            running = self.running.get(client_id, 0)
+            cap = self.client_slots.get(client_id, 0)
+
+            if cap and running >= cap:
+                continue
+
+            share = running / self.client_weight.get(client_id, 1)
+            candidates.append((share, queue[0].queued, client_id))
+
+        return [self.queues[client_id][0] for _, _, client_id in sorted(candidates)]
+
+    def _dispatch(self):
+        report = monotonic() + DEFAULT_SCHEDULER_REPORT_INTERVAL
+
+        while True:
+            if monotonic() > report:
+                self._report()
+                report = monotonic() + DEFAULT_SCHEDULER_REPORT_INTERVAL
+
+            with self.cond:
+                candidates = []
+                if sum(self.running.values()) < self.slots:
+                    candidates = self._candidates()
+
+                if not candidates:
+                    self.cond.wait(max(report - monotonic(), 0))
+                    continue
+
+            load = self.load_sampler.current()
+            cpu, mem = load.cpu_load, load.mem_free
+
+            job = None
+            for candidate in candidates:
+                if cpu <= candidate.request.cpu_load and mem >= candidate.request.mem_free:
+                    job = candidate
+                    break
+
+            if not job:
+                for candidate in candidates:
+                    logger.warning(
+                        "[{}][{}] Workload limits are reached: current: {:>4}%, {}, limit: {:>2}%, {}".format(
+                            candidate.request.client_id, candidate.task_hash, cpu, human_size(mem),
+                            candidate.request.cpu_load, human_size(candidate.request.mem_free)))
+
+                with self.cond:
+                    self.cond.wait(DEFAULT_LOAD_RETRY_DELAY)
+
+                continue
+
+            with self.cond:
+                client_id = job.request.client_id
+
+                queue = self.queues.get(client_id)
+                if not queue or queue[0] is not job:
+                    continue
+
+                queue.popleft()
+                if not queue:
+                    del self.queues[client_id]
+
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+
+                wait = monotonic() - job.queued
+                self.waits.append(wait)
+                self.running[client_id] = self.running.get(client_id, 0) + 1
+
+            metrics.phase_seconds.observe(wait, "queue_wait", job.request.browser.type, client_id)
+
+            logger.debug("[{}][{}] Job started: queue wait: {:.2f}s, slots: {} of {}".format(
+                client_id, job.task_hash, wait, sum(self.running.values()), self.slots))
+
+            self.executor.submit(self._run, job)
+
+    def _report(self):
+        stats = self.stats()
+
+        if stats["running"] > 0 or stats["queued"] > 0:
+            logger.info("Scheduler: slots: {} of {}, queued: {}, wait: avg: {:.2f}s, max: {:.2f}s".format(
+                stats["running"], stats["slots"], stats["queued"], stats["wait_avg"], stats["wait_max"]))
+
+    def _run(self, job):
+        try:
+            job.future.set_result(job.fn(*job.args))
+
+        except Exception as e:
+            logger.error("[{}][{}] Unexpected job error: {}".format(job.request.client_id, job.task_hash, e))
+            job.future.set_exception(e)
+
+        finally:
+            with self.cond:
+                client_id = job.request.client_id
+
+                self.running[client_id] -= 1
+                if self.running[client_id] == 0:
+                    del self.running[client_id]
+
+                self.cond.notify_all()
@@ -0,0 +1,157 @@
+import logging
+
+from collections import deque
+from threading import Condition
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+logger = logging.getLogger("webchela.server.stream")
+
+
+def data_chunks(result_binary, chunk_size, compression=""):
+    # Split serialized result into chunks lazily, parts are cut from memoryview without intermediate copies,
+    # the only copy is made for the chunk message (protobuf doesn't accept memoryview).
+    if len(result_binary) > chunk_size:
+        view = memoryview(result_binary)
+
+        for i in range(0, len(view), chunk_size):
+            yield webchela_pb2.Chunk(
+                chunk=view[i:i + chunk_size].tobytes(),
+                end=i + chunk_size >= len(view),
+                compression=compression
+            )
+    else:
+        yield webchela_pb2.Chunk(
+            chunk=result_binary,
+            end=True,
+            compression=compression
+        )
+
+
+class ResultStream:
+    # Results are passed from browser threads to the task thread as soon as they are ready.
+    #
+    # ordered: results are released strictly by url index, out of order results are held in the reorder buffer.
+    # unordered: results are released as they come, client uses "Result.url_index" to match them.
+    #
+    # "limit" is not a hard limit for producers (blocking browser threads might lead to deadlock),
+    # it is checked before new urls are taken for processing (see UrlQueue).
+    #
+    # "listener" is called with every put/skipped url (see UrlQueue).
+    # "waker" is called with every event, asyncio server is woken up by it (wait isn't used then).
+    # "trace" - task trace (None if tracing is off), browsers add their spans into it.
+
+    def __init__(self, ordered, limit):
+        self.ordered = ordered
+        self.limit = limit
+        self.listener = None
+        self.waker = None
+        self.trace = None
+
+        self.changed = False  # something happened since last wait (result, finished job etc.).
+        self.closed = False
+        self.cond = Condition()
+
+        self.next_index = 0  # next url index expected by ordered stream.
+        self.pending = {}  # url index -> result (None if url was skipped).
+        self.ready = deque()  # results ready to be sent.
+
+    def backlog(self) -> int:
+        with self.cond:
+            return len(self.ready) + len([r for r in self.pending.values() if r is not None])
+
+    def full(self) -> bool:
+        return self.backlog() >= self.limit
+
+    def put(self, index, result):
+        self._put(index, result)
+
+        # outside of lock, listener might pass result to other streams.
+        if self.listener:
+            self.listener(index, result)
+
+    def skip(self, index):
+        # Url won't produce result (browser error, task timeout etc.), don't wait for it.
+        if self.ordered:
+            self._put(index, None)
+
+        if self.listener:
+            self.listener(index, None)
+
+    def notify(self):
+        # Wake up task (job is finished, for instance).
+        with self.cond:
+            self._changed()
+
+    def wait(self, timeout):
+        # Wait for any event since previous call, events happened before the call aren't lost.
+        with self.cond:
+            if not self.changed and not self.closed:
+                self.cond.wait(timeout)
+
+            self.changed = False
+
+    def wait_space(self, timeout):
+        # Wait until results are sent and the stream has space.
+        with self.cond:
+            if self.backlog() >= self.limit and not self.closed:
+                self.cond.wait(timeout)
+
+    def take(self) -> list:
+        with self.cond:
+            results = list(self.ready)
+            self.ready.clear()
+
+            # wake up producers waiting for space.
+            if results:
+                self.cond.notify_all()
+
+            return results
+
+    def close(self) -> list:
+        # Return everything left in the stream (ordered by url index), drop further results.
+        with self.cond:
+            self.closed = True
+
+            results = list(self.ready)
+            self.ready.clear()
+
+            for index in sorted(self.pending):
+                if self.pending[index] is not None:
+                    results.append(self.pending[index])
+
+            self.pending.clear()
+            self._changed()
+
+            return results
+
+    def _changed(self):
+        self.changed = True
+        self.cond.notify_all()
+
+        if self.waker:
+            self.waker()
+
+    def _put(self, index, result):
+        with self.cond:
+            if self.closed:
+                return
+
+            if self.ordered:
+                if index < self.next_index or index in self.pending:
+                    return
+
+                self.pending[index] = result
+                self._release()
+            else:
+                self.ready.append(result)
+
+            self._changed()
+
+    def _release(self):
+        while self.next_index in self.pending:
+            result = self.pending.pop(self.next_index)
+            if result is not None:
+                self.ready.append(result)
+
+            self.next_index += 1
@@ -0,0 +1,49 @@
+import json
+import logging
+
+from threading import Lock
+from time import monotonic
+
+logger = logging.getLogger("webchela.server.trace")
+
+
+class TaskTrace:
+    # Spans of a task (jobs, urls, phases), times are relative to the task start (seconds).
+    # Tracing is enabled by client (Task.trace), tasks without trace don't create it.
+
+    def __init__(self, client_id, task_hash):
+        self.client_id = client_id
+        self.task_hash = task_hash
+
+        self.lock = Lock()
+        self.jobs = 0
+        self.spans = []
+        self.started = monotonic()
+
+    def add(self, name, started, duration, **attrs):
+        span = {
+            "name": name,
+            "start": round(started - self.started, 4),
+            "duration": round(duration, 4),
+        }
+
+        for key, value in attrs.items():
+            if value is not None:
+                span[key] = value
+
+        with self.lock:
+            self.spans.append(span)
+
+    def job(self) -> int:
+        with self.lock:
+            self.jobs += 1
+            return self.jobs
+
+    def to_json(self) -> str:
+        with self.lock:
+            return json.dumps({
+                "client_id": self.client_id,
+                "task_hash": self.task_hash,
+                "duration": round(monotonic() - self.started, 4),
+                "spans": sorted(self.spans, key=lambda span: span["start"]),
+            })
@@ -0,0 +1,184 @@
+import logging
+import uuid
+
+from collections import deque
+from threading import Lock
+
+import webchela.core.protobuf.webchela_pb2 as webchela_pb2
+
+from webchela.core.cache import result_key
+from webchela.core.vars import DEFAULT_URLS_SPACE_WAIT
+
+logger = logging.getLogger("webchela.server.urls")
+
+
+class UrlItem:
+    # Url and everything attached to it, "index" is url position in task.
+    def __init__(self, index, url, cookie, screenshot, script):
+        self.index = index
+        self.url = url
+        self.cookie = cookie
+        self.screenshot = screenshot
+        self.script = script
+
+
+class UrlQueue:
+    # Task urls shared between running browser instances, idle instance takes remaining urls.
+    #
+    # Urls with fresh cached results go to stream right away, they don't need browsers.
+    # Urls which are being loaded by other tasks (or duplicates within the task) when browser takes them
+    # aren't loaded, their results are passed from the leading queue (see FlightRegistry).
+
+    def __init__(self, config, request, stream, cache, flights):
+        self.stream = stream
+        self.flights = flights
+
+        self.cached = 0
+        self.closed = False
+        self.followed = 0
+        self.keys = {}  # url index -> cache key, for urls which results should be cached.
+        self.leading = {}  # url index -> key, for urls which results are passed to followers.
+        self.flight_keys = {}  # url index -> key, for queued urls.
+        self.lock = Lock()
+        self.items = deque()
+        self.waiting = set()  # indexes of followed urls without results.
+
+        for index, url in enumerate(request.urls):
+            item = UrlItem(
+                index,
+                url,
+                request.cookies[index] if index < len(request.cookies) else "",
+                request.screenshots[index] if index < len(request.screenshots) else "",
+                request.scripts[index] if index < len(request.scripts) else "",
+            )
+
+            key = result_key(config, request, item)
+
+            if cache.enabled(request):
+                result = cache.get(key, request.cache_max_age)
+
+                if result is not None:
+                    result.UUID = str(uuid.uuid4())
+                    result.url_index = index
+
+                    stream.put(index, result)
+                    self.cached += 1
+
+                    continue
+
+                self.keys[index] = key
+
+            self.flight_keys[index] = key
+            self.items.append(item)
+
+        # Results of leading urls are passed to followers.
+        stream.listener = self._done
+
+    def adopt(self, key, item) -> bool:
+        # Leader of followed url is gone, load url.
+        with self.lock:
+            if self.closed:
+                return False
+
+            self.waiting.discard(item.index)
+            self.leading[item.index] = key
+            self.items.appendleft(item)
+
+        self.stream.notify()
+
+        return True
+
+    def close(self):
+        # Task is finished (timeout, for instance), nothing to take.
+        with self.lock:
+            self.closed = True
+            self.items.clear()
+            self.waiting.clear()
+
+            leading = list(self.leading.values())
+            self.leading.clear()
+
+        for key in leading:
+            self.flights.abort(key)
+
+    def drop(self):
+        # Task can't load urls (browsers aren't launched), remaining urls won't produce results.
+        with self.lock:
+            items = list(self.items)
+            self.items.clear()
+
+        for item in items:
+            self.stream.skip(item.index)
+
+    def receive(self, item, result):
+        # Result of followed url (None if leader failed).
+        if result is None:
+            self.stream.skip(item.index)
+        else:
+            copy = webchela_pb2.Result()
+            copy.CopyFrom(result)
+            copy.UUID = str(uuid.uuid4())
+            copy.url = item.url
+            copy.url_index = item.index
+
+            self.stream.put(item.index, copy)
+
+        # result is in stream, task can finish.
+        with self.lock:
+            self.waiting.discard(item.index)
+
+        self.stream.notify()
+
+    def remaining(self) -> int:
+        with self.lock:
+            return len(self.items)
+
+    def take(self, amount, block=True) -> list:
+        # Urls are taken in order, take is paused while there are too many unsent results.
+        # Don't block if caller holds urls without results, ordered stream might wait for them.
+        while True:
+            with self.lock:
+                if self.closed or not self.items:
+                    return []
+
+                if not self.stream.full():
+                    return self._lead(amount)
+
+            if not block:
+                return []
+
+            self.stream.wait_space(DEFAULT_URLS_SPACE_WAIT)
+
+    def waited(self) -> int:
+        # Amount of followed urls without results.
+        with self.lock:
+            return len(self.waiting)
+
+    def _lead(self, amount) -> list:
+        # Urls are joined to flights when browser takes them: urls being loaded by other tasks are followed,
+        # others are loaded by the task. Adopted urls are led already. Lock is held by caller.
+        items = []
+
+        while self.items and len(items) < amount:
+            item = self.items.popleft()
+
+            if item.index not in self.leading:
+                key = self.flight_keys[item.index]
+
+                if self.flights.join(key, self, item):
+                    self.waiting.add(item.index)
+                    self.followed += 1
+                    continue
+
+                self.leading[item.index] = key
+
+            items.append(item)
+
+        return items
+
+    def _done(self, index, result):
+        with self.lock:
+            key = self.leading.pop(index, None)
+
+        if key:
+            self.flights.land(key, result)
@@ -3,6 +3,8 @@ import logging
 import os
 import re
 
+from webchela.core.block import BLOCK_TYPES
+from webchela.core.compression import COMPRESSION_LEVELS
 from webchela.core.utils import human_size
 from webchela.core.vars import DEFAULT_LOG_FORMAT, DEFAULT_LOG_LEVEL
 
@@ -10,6 +12,25 @@ logger = logging.getLogger("webchela.validate")
 coloredlogs.install(fmt=DEFAULT_LOG_FORMAT, level=DEFAULT_LOG_LEVEL)
 
 
+def is_block_types(name, value, default):
+    # Unknown resource types are skipped.
+    v = []
+
+    if not isinstance(value, list):
+        value = default
+
+    for item in value:
+        if str(item).lower() in BLOCK_TYPES:
+            v.append(str(item).lower())
+        else:
+            logger.warning("{}: invalid value: {}".format(name, item))
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
 def is_bool(name, value, default):
     if isinstance(value, bool):
         v = value
@@ -36,9 +57,22 @@ def is_browser_geometry(name, value, default):
     return v, int(x), int(y)
 
 
+def is_browser_network(name, value, default):
+    vl = str(value).lower()
+    if vl == "proxy" or vl == "native":
+        v = vl
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
 def is_browser_type(name, value, default):
     vl = str(value).lower()
-    if vl == "chrome" or vl == "firefox":
+    if vl == "chrome" or vl == "firefox" or vl == "fake":
         v = vl
     else:
         v = default
@@ -76,6 +110,54 @@ def is_bytes(name, value, default):
     return v
 
 
+def is_client_values(name, value, default):
+    # ["client_id:value", ...] -> {"client_id": value, ...}, values must be positive.
+    v = {}
+
+    if not isinstance(value, list):
+        value = default
+
+    for item in value:
+        if re.match("^.*:[0-9]+$", str(item)):
+            client_id, amount = str(item).rsplit(":", 1)
+            if int(amount) > 0:
+                v[client_id] = int(amount)
+                continue
+
+        logger.warning("{}: invalid value: {}".format(name, item))
+
+    logger.debug("{}: {}".format(name, v))
+    return v
+
+
+def is_compression(name, value, default):
+    vl = str(value).lower()
+    if vl in ["", "gzip", "zstd"]:
+        v = vl
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
+def is_compression_level(name, value, method, default):
+    # 0 - default level of method, any level is good if there is no compression.
+    low, high = COMPRESSION_LEVELS.get(method, (0, float("inf")))
+
+    if isinstance(value, int) and not isinstance(value, bool) and (value == 0 or low <= value <= high):
+        v = value
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
 def is_dir(name, value, default):
     if os.path.isdir(value):
         v = value
@@ -100,6 +182,17 @@ def is_file(name, value, default):
     return v
 
 
+def is_grpc_compression(name, value, default):
+    vl = str(value).lower()
+    if vl in ["", "deflate", "gzip"]:
+        v = vl
+    else:
+        v = default
+
+    logger.debug("{}: {}".format(name, v))
+    return v
+
+
 def is_int(name, value, default):
     if isinstance(value, int):
         v = value
@@ -120,6 +213,19 @@ def is_list(name, value, default):
     return v
 
 
+def is_load_event(name, value, default):
+    vl = str(value).lower()
+    if vl in ["", "domcontentloaded", "load", "networkidle"]:
+        v = vl
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
 def is_log_level(value, default):
     v = str(value).upper()
     levels = ["SPAM", "DEBUG", "VERBOSE", "INFO", "NOTICE", "WARNING", "SUCCESS", "ERROR", "CRITICAL"]
@@ -129,6 +235,32 @@ def is_log_level(value, default):
         return default
 
 
+def is_screenshot_format(name, value, default):
+    vl = str(value).lower()
+    if vl in ["", "jpeg", "png", "webp"]:
+        v = vl
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
+def is_server_mode(name, value, default):
+    vl = str(value).lower()
+    if vl == "thread" or vl == "asyncio":
+        v = vl
+    else:
+        v = default
+
+    if name:
+        logger.debug("{}: {}".format(name, v))
+
+    return v
+
+
 def is_string(name, value, default):
     if isinstance(value, str):
         v = value
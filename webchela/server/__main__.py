@@ -1,26 +1,39 @@
 import sys
 
+import asyncio
 import coloredlogs
 import gc
 import grpc
+import grpc.aio
 import importlib
 import logging
+import math
 import signal
 
 from concurrent import futures
-from concurrent.futures import ThreadPoolExecutor
-from time import sleep
-from threading import Lock
+from time import monotonic
 
+import webchela.core.metrics as metrics
 import webchela.core.protobuf.webchela_pb2 as webchela_pb2
 import webchela.core.protobuf.webchela_pb2_grpc as webchela_pb2_grpc
 
-from webchela.core.browser import chrome_grabber, firefox_grabber
+from webchela.core.cache import ResultCache
+from webchela.core.compression import compress, compression_method
 from webchela.core.config import Config
+from webchela.core.flight import FlightRegistry
+from webchela.core.image import ScreenshotEncoder, screenshot_format
+from webchela.core.load import LoadSampler
+from webchela.core.pool import BrowserPool
+from webchela.core.scheduler import Scheduler
+from webchela.core.stream import ResultStream, data_chunks
+from webchela.core.trace import TaskTrace
+from webchela.core.urls import UrlQueue
 
 # Get configuration, set log level.
-from webchela.core.utils import get_load, gen_hash, split_items, human_size, exit_handler
-from webchela.core.validate import is_browser_type
+from webchela.core.utils import gen_hash, human_size, exit_handler
+from webchela.core.validate import is_block_types, is_browser_network, is_browser_type, is_compression, is_load_event
+from webchela.core.validate import is_compression_level, is_screenshot_format
+from webchela.core.vars import DEFAULT_LEASE_FAILURES, DEFAULT_LOAD_RETRY_DELAY
 from webchela.core.vars import DEFAULT_LOG_FORMAT, APP_NAME, APP_VERSION
 
 config = Config()
@@ -36,249 +49,490 @@ logging.getLogger("seleniumwire").setLevel(logging.ERROR)
 logging.getLogger("selenium.webdriver.remote.remote_connection").setLevel(logging.ERROR)
 logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
 
-get_load_mutex = Lock()
-get_load_busy = False
+# Launched browsers are shared between tasks.
+browser_pool = BrowserPool(config)
 
+# Finished results are shared between tasks.
+result_cache = ResultCache(config)
 
-class Server(webchela_pb2_grpc.ServerServicer):
-    def GetLoad(self, request, context):
-        # Prevent race between clients.
-        # Give clients "cpu_load=1, mem_free=1, score=1",
-        # if some client already requesting server load.
-        global get_load_busy
+# Identical urls of running tasks are loaded once.
+flights = FlightRegistry()
 
-        if get_load_busy:
-            # don't use "0", "0" could mean wrong protobuf message fields values.
-            return webchela_pb2.Load(cpu_load=1, mem_free=1, score=1)
-        else:
-            with get_load_mutex:
-                get_load_busy = True
+# Server workload is measured in background.
+load_sampler = LoadSampler(config)
 
-                _, cpu_load, mem_free, score = get_load(0, 0, 5)
+# Browser slots are shared between tasks.
+scheduler = Scheduler(config, load_sampler)
 
-                get_load_busy = False
+# Screenshots are encoded in background.
+screenshot_encoder = ScreenshotEncoder(config)
 
-                return webchela_pb2.Load(cpu_load=cpu_load, mem_free=mem_free, score=score)
+# Channel compression (server.grpc_compression).
+GRPC_COMPRESSIONS = {
+    "": grpc.Compression.NoCompression,
+    "deflate": grpc.Compression.Deflate,
+    "gzip": grpc.Compression.Gzip,
+}
 
-    def RunTask(self, request, context):
-        # Generate hash for log messages.
-        task_hash = gen_hash()
-
-        # --------------------------------------------------------------------------------------------------------------
-        # Set defaults, if client provides nothing.
-
-        if not request.browser.type:
-            request.browser.type = config.params.default.browser_type
-        else:
-            request.browser.type = is_browser_type("", request.browser.type, config.params.default.browser_type)
-
-        if not request.browser.argument:
-            request.browser.argument.extend(config.params.default.browser_argument)
-
-        if not request.browser.extension:
-            request.browser.extension.extend(config.params.default.browser_extension)
-
-        if request.browser.instance == 0:
-            request.browser.instance = config.params.default.browser_instance
-
-        if request.browser.instance_tab == 0:
-            request.browser.instance_tab = config.params.default.browser_instance_tab
-
-        if not request.browser.proxy:
-            request.browser.proxy = config.params.default.browser_proxy
-
-
-        if request.chunk_size == 0:
-            request.chunk_size = config.params.default.chunk_size
-
-        if request.cpu_load == 0:
-            request.cpu_load = config.params.default.cpu_load
-
-        if request.mem_free == 0:
-            request.mem_free = config.params.default.mem_free
-
-        if request.page_size == 0:
-            request.page_size = config.params.default.page_size
-
-        if request.page_timeout == 0:
-            request.page_timeout = config.params.default.page_timeout
-
-        if not request.retry_codes:
-            request.retry_codes.extend(config.params.default.retry_codes)
-
-        if request.retry_codes_tries == 0:
-            request.retry_codes_tries = config.params.default.retry_codes_tries
-
-        if request.screenshot_timeout == 0:
-            request.screenshot_timeout = config.params.default.screenshot_timeout
-
-        if request.script_timeout == 0:
-            request.script_timeout = config.params.default.script_timeout
-
-        if request.timeout == 0:
-            request.timeout = config.params.default.task_timeout
-
-        # Split urls per tabs.
-        jobs_urls = split_items(request.urls, request.browser.instance_tab)
-        jobs_cookies = split_items(request.cookies, request.browser.instance_tab)
-        jobs_screenshots = split_items(request.screenshots, request.browser.instance_tab)
-        jobs_scripts = split_items(request.scripts, request.browser.instance_tab)
-
-        # --------------------------------------------------------------------------------------------------------------
-
-        # Save jobs amount (jobs list will be shrunk).
-        jobs_amount = len(jobs_urls)
-
-        logger.info(
-            "[{}][{}] Task received. Total: jobs: {}, urls: {}, cookies: {}, screenshots: {}, scripts {}.".format(
-                request.client_id,
-                task_hash,
-                jobs_amount,
-                len(request.urls),
-                len(request.cookies),
-                len(request.screenshots),
-                len(request.scripts)))
-
-        logger.debug("[{}][{}] browser.type: {}".format(
-            request.client_id, task_hash, request.browser.type))
-        logger.debug("[{}][{}] browser.argument: {}".format(
-            request.client_id, task_hash, request.browser.argument))
-        logger.debug("[{}][{}] browser.extension: {}".format(
-            request.client_id, task_hash, request.browser.extension))
-        logger.debug("[{}][{}] browser.geometry: {}".format(
-            request.client_id, task_hash, request.browser.geometry))
-        logger.debug("[{}][{}] browser.instance: {}".format(
-            request.client_id, task_hash, request.browser.instance))
-        logger.debug("[{}][{}] browser.instance_tab: {}".format(
-            request.client_id, task_hash, request.browser.instance_tab))
-        logger.debug("[{}][{}] browser.proxy: {}".format(
-            request.client_id, task_hash, request.browser.proxy))
-
-        logger.debug("[{}][{}] debug.pre_close_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_close_delay))
-        logger.debug("[{}][{}] debug.pre_cookie_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_cookie_delay))
-        logger.debug("[{}][{}] debug.pre_open_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_open_delay))
-        logger.debug("[{}][{}] debug.pre_process_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_process_delay))
-        logger.debug("[{}][{}] debug.pre_screenshot_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_screenshot_delay))
-        logger.debug("[{}][{}] debug.pre_script_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_script_delay))
-        logger.debug("[{}][{}] debug.pre_wait_delay: {}".format(
-            request.client_id, task_hash, request.debug.pre_wait_delay))
-
-        logger.debug("[{}][{}] chunk_size: {}".format(
-            request.client_id, task_hash, human_size(request.chunk_size)))
-        logger.debug("[{}][{}] cpu_load: {}%".format(
-            request.client_id, task_hash, request.cpu_load))
-        logger.debug("[{}][{}] mem_free: {}".format(
-            request.client_id, task_hash, human_size(request.mem_free)))
-        logger.debug("[{}][{}] page_size: {}".format(
-            request.client_id, task_hash, human_size(request.page_size)))
-        logger.debug("[{}][{}] page_timeout: {}".format(
-            request.client_id, task_hash, request.page_timeout))
-        logger.debug("[{}][{}] retry_codes: {}".format(
-            request.client_id, task_hash, request.retry_codes))
-        logger.debug("[{}][{}] retry_codes_tries: {}".format(
-            request.client_id, task_hash, request.retry_codes_tries))
-        logger.debug("[{}][{}] screenshot_timeout: {}".format(
-            request.client_id, task_hash, request.screenshot_timeout))
-        logger.debug("[{}][{}] script_timeout: {}".format(
-            request.client_id, task_hash, request.script_timeout))
-        logger.debug("[{}][{}] tab_open_randomize: {}".format(
-            request.client_id, task_hash, request.tab_open_randomize))
-        logger.debug("[{}][{}] timeout: {}".format(
-            request.client_id, task_hash, request.timeout))
-
-        jobs_running = []  # will contain jobs/threads.
-        results = {}  # will contain results of all jobs.
-        timeout_counter = 0  # count task timeout.
-
-        # Main thread pool for job processing.
-        # Amount of threads is limited by browser instances amount, not pool itself.
-        executor = ThreadPoolExecutor()
 
+def server_load():
+    # Averaged workload, doesn't block.
+    load = load_sampler.average()
+    stats = scheduler.stats()
+
+    return webchela_pb2.Load(cpu_load=load.cpu_load, mem_free=load.mem_free, score=load.score,
+                             jobs_running=stats["running"], jobs_queued=stats["queued"])
+
+
+def prepare_task(request) -> str:
+    # Generate hash for log messages.
+    task_hash = gen_hash()
+
+    # --------------------------------------------------------------------------------------------------------------
+    # Set defaults, if client provides nothing.
+
+    if not request.browser.type:
+        request.browser.type = config.params.default.browser_type
+    else:
+        request.browser.type = is_browser_type("", request.browser.type, config.params.default.browser_type)
+
+    if not request.browser.argument:
+        request.browser.argument.extend(config.params.default.browser_argument)
+
+    if not request.browser.extension:
+        request.browser.extension.extend(config.params.default.browser_extension)
+
+    if not request.browser.HasField("headless"):
+        request.browser.headless = config.params.default.browser_headless
+
+    if request.browser.instance == 0:
+        request.browser.instance = config.params.default.browser_instance
+
+    if request.browser.instance_tab == 0:
+        request.browser.instance_tab = config.params.default.browser_instance_tab
+
+    if not request.browser.network:
+        request.browser.network = config.params.default.browser_network
+    else:
+        request.browser.network = is_browser_network(
+            "", request.browser.network, config.params.default.browser_network)
+
+    if not request.browser.proxy:
+        request.browser.proxy = config.params.default.browser_proxy
+
+    if not request.block_types:
+        request.block_types.extend(config.params.default.block_types)
+    else:
+        block_types = is_block_types("", list(request.block_types), config.params.default.block_types)
+        del request.block_types[:]
+        request.block_types.extend(block_types)
+
+    if not request.block_urls:
+        request.block_urls.extend(config.params.default.block_urls)
+
+    if request.cache_max_age == 0:
+        request.cache_max_age = config.params.default.cache_max_age
+
+    if request.chunk_size == 0:
+        request.chunk_size = config.params.default.chunk_size
+
+    if not request.compression:
+        request.compression = config.params.default.compression
+    else:
+        request.compression = is_compression("", request.compression, config.params.default.compression)
+
+    # server chooses available method.
+    request.compression = compression_method(request.compression)
+
+    if request.compression_level == 0:
+        request.compression_level = config.params.default.compression_level
+
+    # level must be in range of method (default level might be set for other method).
+    request.compression_level = is_compression_level("", request.compression_level, request.compression, 0)
+
+    if request.cpu_load == 0:
+        request.cpu_load = config.params.default.cpu_load
+
+    if not request.load_event:
+        request.load_event = config.params.default.load_event
+    else:
+        request.load_event = is_load_event("", request.load_event, config.params.default.load_event)
+
+    if request.mem_free == 0:
+        request.mem_free = config.params.default.mem_free
+
+    if not request.HasField("page_body_raw"):
+        request.page_body_raw = config.params.default.page_body_raw
+
+    if request.page_size == 0:
+        request.page_size = config.params.default.page_size
+
+    if request.page_timeout == 0:
+        request.page_timeout = config.params.default.page_timeout
+
+    if not request.retry_codes:
+        request.retry_codes.extend(config.params.default.retry_codes)
+
+    if request.retry_codes_tries == 0:
+        request.retry_codes_tries = config.params.default.retry_codes_tries
+
+    if not request.screenshot_format:
+        request.screenshot_format = config.params.default.screenshot_format
+    else:
+        request.screenshot_format = is_screenshot_format(
+            "", request.screenshot_format, config.params.default.screenshot_format)
+
+    # server chooses available format.
+    request.screenshot_format = screenshot_format(request.screenshot_format)
+
+    if request.screenshot_max_height == 0:
+        request.screenshot_max_height = config.params.default.screenshot_max_height
+
+    if request.screenshot_max_width == 0:
+        request.screenshot_max_width = config.params.default.screenshot_max_width
+
+    if request.screenshot_quality == 0:
+        request.screenshot_quality = config.params.default.screenshot_quality
+
+    if request.screenshot_timeout == 0:
+        request.screenshot_timeout = config.params.default.screenshot_timeout
+
+    if request.script_timeout == 0:
+        request.script_timeout = config.params.default.script_timeout
+
+    if request.stream_buffer == 0:
+        request.stream_buffer = config.params.default.stream_buffer
+
+    if not request.HasField("stream_unordered"):
+        request.stream_unordered = config.params.default.stream_unordered
+
+    if not request.HasField("tab_pipeline"):
+        request.tab_pipeline = config.params.default.tab_pipeline
+
+    if request.timeout == 0:
+        request.timeout = config.params.default.task_timeout
+
+    # --------------------------------------------------------------------------------------------------------------
+
+    # Amount of url batches (browser instances take urls from shared queue by batches).
+    jobs_amount = math.ceil(len(request.urls) / request.browser.instance_tab)
+
+    logger.info(
+        "[{}][{}] Task received. Total: jobs: {}, urls: {}, cookies: {}, screenshots: {}, scripts {}.".format(
+            request.client_id,
+            task_hash,
+            jobs_amount,
+            len(request.urls),
+            len(request.cookies),
+            len(request.screenshots),
+            len(request.scripts)))
+
+    logger.debug("[{}][{}] browser.type: {}".format(
+        request.client_id, task_hash, request.browser.type))
+    logger.debug("[{}][{}] browser.argument: {}".format(
+        request.client_id, task_hash, request.browser.argument))
+    logger.debug("[{}][{}] browser.extension: {}".format(
+        request.client_id, task_hash, request.browser.extension))
+    logger.debug("[{}][{}] browser.geometry: {}".format(
+        request.client_id, task_hash, request.browser.geometry))
+    logger.debug("[{}][{}] browser.headless: {}".format(
+        request.client_id, task_hash, request.browser.headless))
+    logger.debug("[{}][{}] browser.instance: {}".format(
+        request.client_id, task_hash, request.browser.instance))
+    logger.debug("[{}][{}] browser.instance_tab: {}".format(
+        request.client_id, task_hash, request.browser.instance_tab))
+    logger.debug("[{}][{}] browser.network: {}".format(
+        request.client_id, task_hash, request.browser.network))
+    logger.debug("[{}][{}] browser.proxy: {}".format(
+        request.client_id, task_hash, request.browser.proxy))
+
+    logger.debug("[{}][{}] debug.pre_close_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_close_delay))
+    logger.debug("[{}][{}] debug.pre_cookie_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_cookie_delay))
+    logger.debug("[{}][{}] debug.pre_open_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_open_delay))
+    logger.debug("[{}][{}] debug.pre_process_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_process_delay))
+    logger.debug("[{}][{}] debug.pre_screenshot_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_screenshot_delay))
+    logger.debug("[{}][{}] debug.pre_script_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_script_delay))
+    logger.debug("[{}][{}] debug.pre_wait_delay: {}".format(
+        request.client_id, task_hash, request.debug.pre_wait_delay))
+
+    logger.debug("[{}][{}] block_types: {}".format(
+        request.client_id, task_hash, request.block_types))
+    logger.debug("[{}][{}] block_urls: {}".format(
+        request.client_id, task_hash, request.block_urls))
+    logger.debug("[{}][{}] cache_max_age: {}".format(
+        request.client_id, task_hash, request.cache_max_age))
+    logger.debug("[{}][{}] chunk_size: {}".format(
+        request.client_id, task_hash, human_size(request.chunk_size)))
+    logger.debug("[{}][{}] compression: {}".format(
+        request.client_id, task_hash, request.compression))
+    logger.debug("[{}][{}] compression_level: {}".format(
+        request.client_id, task_hash, request.compression_level))
+    logger.debug("[{}][{}] cpu_load: {}%".format(
+        request.client_id, task_hash, request.cpu_load))
+    logger.debug("[{}][{}] load_event: {}".format(
+        request.client_id, task_hash, request.load_event))
+    logger.debug("[{}][{}] mem_free: {}".format(
+        request.client_id, task_hash, human_size(request.mem_free)))
+    logger.debug("[{}][{}] page_body_raw: {}".format(
+        request.client_id, task_hash, request.page_body_raw))
+    logger.debug("[{}][{}] page_size: {}".format(
+        request.client_id, task_hash, human_size(request.page_size)))
+    logger.debug("[{}][{}] page_timeout: {}".format(
+        request.client_id, task_hash, request.page_timeout))
+    logger.debug("[{}][{}] retry_codes: {}".format(
+        request.client_id, task_hash, request.retry_codes))
+    logger.debug("[{}][{}] retry_codes_tries: {}".format(
+        request.client_id, task_hash, request.retry_codes_tries))
+    logger.debug("[{}][{}] screenshot_format: {}".format(
+        request.client_id, task_hash, request.screenshot_format))
+    logger.debug("[{}][{}] screenshot_max_height: {}".format(
+        request.client_id, task_hash, request.screenshot_max_height))
+    logger.debug("[{}][{}] screenshot_max_width: {}".format(
+        request.client_id, task_hash, request.screenshot_max_width))
+    logger.debug("[{}][{}] screenshot_quality: {}".format(
+        request.client_id, task_hash, request.screenshot_quality))
+    logger.debug("[{}][{}] screenshot_timeout: {}".format(
+        request.client_id, task_hash, request.screenshot_timeout))
+    logger.debug("[{}][{}] script_timeout: {}".format(
+        request.client_id, task_hash, request.script_timeout))
+    logger.debug("[{}][{}] stream_buffer: {}".format(
+        request.client_id, task_hash, request.stream_buffer))
+    logger.debug("[{}][{}] stream_unordered: {}".format(
+        request.client_id, task_hash, request.stream_unordered))
+    logger.debug("[{}][{}] tab_open_randomize: {}".format(
+        request.client_id, task_hash, request.tab_open_randomize))
+    logger.debug("[{}][{}] tab_pipeline: {}".format(
+        request.client_id, task_hash, request.tab_pipeline))
+    logger.debug("[{}][{}] timeout: {}".format(
+        request.client_id, task_hash, request.timeout))
+    logger.debug("[{}][{}] trace: {}".format(
+        request.client_id, task_hash, request.trace))
+
+    return task_hash
+
+
+class TaskResult:
+    # Result ready to be sent, "key" - cache key (None if result isn't cached).
+    def __init__(self, result, key):
+        self.result = result
+        self.key = key
+
+
+def screenshots_pending(result) -> bool:
+    # Binary screenshots are encoded before sending, cached results are already encoded.
+    return bool(result.screenshots_binary) and not result.screenshot_format
+
+
+def result_data(request, task_hash, step) -> bytes:
+    # Serialize result once, cache and compress it.
+    # Screenshots are encoded and results are compressed by the task (not by browsers),
+    # browser slots aren't held for that.
+    result = step.result
+
+    if screenshots_pending(result):
+        with metrics.phase("screenshot_encode", request):
+            result = screenshot_encoder.encode(request, task_hash, result)
+
+    with metrics.phase("serialize", request):
+        data = result.SerializeToString()
+
+    if step.key:
+        result_cache.put(step.key, result, data)
+
+    if request.compression:
+        with metrics.phase("compress", request):
+            data = compress(data, request.compression, request.compression_level)
+
+    return data
+
+
+def run_task(request, task_hash, stream):
+    # Task loop is shared by servers: results (TaskResult) are yielded for preparing (see result_data) and
+    # sending, chunks are yielded for sending as is, timeouts (numbers) are yielded for waiting stream events
+    # (results, finished jobs), servers prepare results and wait in their own way.
+    jobs_running = []  # will contain jobs/threads (browser instances).
+    results_amount = 0  # count sent results.
+    lease_failures = 0  # consecutive jobs without browser.
+    queue_after = 0  # new jobs are delayed after lease failure.
+    task_deadline = monotonic() + request.timeout  # wall clock task timeout.
+
+    # Spans of jobs, urls and their phases.
+    if request.trace:
+        stream.trace = TaskTrace(request.client_id, task_hash)
+
+    # Urls are shared between browser instances of the task, cached results are sent without browsers,
+    # urls which are loaded by other tasks get their results.
+    queue = UrlQueue(config, request, stream, result_cache, flights)
+
+    try:
         # Iterate over jobs.
         while True:
-            if timeout_counter > request.timeout:
+            if monotonic() > task_deadline:
                 logger.warning("[{}][{}] Task timeout: {}s".format(request.client_id, task_hash, request.timeout))
+                metrics.timeouts.inc("task", request.browser.type, request.client_id)
                 break
 
-            # No jobs, no running jobs. Exit.
-            if len(jobs_urls) == 0 and len(jobs_running) == 0:
+            # Finished jobs free their slots immediately.
+            # Jobs without browser (launch errors) delay new jobs, too many of them in a row fail the task.
+            for job in [job for job in jobs_running if job.done()]:
+                if job.cancelled() or job.exception() is not None:
+                    continue
+
+                if job.result() is None:
+                    lease_failures += 1
+                    queue_after = monotonic() + DEFAULT_LOAD_RETRY_DELAY
+                else:
+                    lease_failures = 0
+
+            jobs_running = [job for job in jobs_running if not job.done()]
+
+            if lease_failures >= DEFAULT_LEASE_FAILURES and queue.remaining() > 0:
+                logger.error("[{}][{}] Task is failed, browser cannot be launched: {} tries".format(
+                    request.client_id, task_hash, lease_failures))
+                queue.drop()
+
+            # Send ready results to client.
+            for result in stream.take():
+                results_amount += 1
+                yield TaskResult(result, queue.keys.get(result.url_index))
+
+            # No urls, no running jobs, no results of other tasks to wait. Exit.
+            urls_remaining = queue.remaining()
+            if urls_remaining == 0 and len(jobs_running) == 0 and queue.waited() == 0:
                 break
 
-            # Run new job if limits (number of jobs, workload limits) are good.
-            if len(jobs_urls) > 0 and len(jobs_running) < request.browser.instance:
-                # 1 second resolution workload stat.
-                load, cpu, mem, _ = get_load(request.cpu_load, request.mem_free)
-                if load:
-                    job_urls = jobs_urls.pop()
-                    job_cookies = []
-                    job_screenshots = []
-                    job_scripts = []
+            # Queue new jobs (browser instances) if limits (number of instances, unsent results) are good,
+            # don't run more instances than remaining batches. Running jobs take urls till the end,
+            # new jobs are needed only at the beginning, if some instance is broken or gave its slot back
+            # to other clients. Browser slots and workload limits are checked by scheduler.
+            while len(jobs_running) < min(request.browser.instance,
+                                          math.ceil(urls_remaining / request.browser.instance_tab)):
+                if stream.full():
+                    logger.debug("[{}][{}] Stream buffer is full: {}".format(
+                        request.client_id, task_hash, request.stream_buffer))
+                    break
 
-                    if len(jobs_cookies) > 0:
-                        job_cookies = jobs_cookies.pop()
+                if monotonic() < queue_after:
+                    break
 
-                    if len(jobs_screenshots) > 0:
-                        job_screenshots = jobs_screenshots.pop()
+                job = scheduler.submit(request, task_hash, browser_pool.process, request, task_hash, stream,
+                                       queue, monotonic(), lambda: scheduler.contended(request.client_id))
 
-                    if len(jobs_scripts) > 0:
-                        job_scripts = jobs_scripts.pop()
+                # Wake up the task when job is finished.
+                job.add_done_callback(lambda _: stream.notify())
+                jobs_running.append(job)
 
-                    job_order = len(jobs_urls)  # be careful of jobs.pop()
+                logger.debug("[{}][{}] Queue job: {} of {}".format(
+                    request.client_id, task_hash, len(jobs_running), request.browser.instance))
 
-                    if request.browser.type == "chrome":
-                        job = executor.submit(chrome_grabber, config, request, task_hash, job_order, job_urls,
-                                              job_cookies, job_screenshots, job_scripts)
-                    else:
-                        job = executor.submit(firefox_grabber, config, request, task_hash, job_order, job_urls,
-                                              job_cookies, job_screenshots, job_scripts)
+            # Wait for results, finished jobs, delayed jobs or task timeout.
+            wake = min(task_deadline, queue_after) if queue_after > monotonic() else task_deadline
+            yield max(wake - monotonic(), 0)
 
-                    jobs_running.append(job)
+        # Send results left in stream (task timeout, for instance).
+        for result in stream.close():
+            results_amount += 1
+            yield TaskResult(result, queue.keys.get(result.url_index))
 
-                    logger.debug("[{}][{}] Run job: {} of {}".format(
-                        request.client_id, task_hash, jobs_amount - len(jobs_urls), jobs_amount))
-                else:
-                    logger.warning(
-                        "[{}][{}] Workload limits are reached: current: {:>4}%, {}, limit: {:>2}%, {}".format(
-                            request.client_id, task_hash, cpu, human_size(mem),
-                            request.cpu_load, human_size(request.mem_free)))
+        # Trace is the last message, it doesn't belong to any result.
+        if stream.trace:
+            yield webchela_pb2.Chunk(trace=stream.trace.to_json(), end=False)
+
+        logger.info("[{}][{}] Task completed. Total: results: {}, cached results: {}, shared results: {}.".format(
+            request.client_id, task_hash, results_amount, queue.cached, queue.followed))
+
+    finally:
+        # Clean jobs (if task timeout or client cancellation, for instance).
+        # Running jobs can't be interrupted, they stop after current urls, their results are dropped.
+        queue.close()
+        stream.close()
+
+        for job in jobs_running:
+            job.cancel()
+
+        if stream.trace:
+            logger.info("[{}][{}] Task trace: {}".format(request.client_id, task_hash, stream.trace.to_json()))
+
+
+class Server(webchela_pb2_grpc.ServerServicer):
+    def GetLoad(self, request, context):
+        return server_load()
+
+    def RunTask(self, request, context):
+        # Task holds a server worker thread, the thread sleeps while waiting for stream events.
+        task_hash = prepare_task(request)
+
+        # Results are sent to client as soon as they are ready (ordered by url index or as is).
+        stream = ResultStream(not request.stream_unordered, request.stream_buffer)
+
+        for step in run_task(request, task_hash, stream):
+            if isinstance(step, TaskResult):
+                yield from data_chunks(result_data(request, task_hash, step), request.chunk_size, request.compression)
+            elif isinstance(step, webchela_pb2.Chunk):
+                yield step
+            else:
+                stream.wait(step)
+
+
+class AsyncServer(webchela_pb2_grpc.ServerServicer):
+    async def GetLoad(self, request, context):
+        return server_load()
 
-            # Wait and check running jobs.
-            for job in jobs_running:
-                if job.done():
-                    result = job.result()
-                    if result:
-                        results = {**results, **result}
+    async def RunTask(self, request, context):
+        # Task is a coroutine, stream events are passed to the event loop from browser threads.
+        # Results are prepared (serialized, compressed) in executor, event loop isn't blocked by them.
+        task_hash = prepare_task(request)
 
-                    jobs_running.remove(job)
+        stream = ResultStream(not request.stream_unordered, request.stream_buffer)
 
-            timeout_counter += 1
-            sleep(1)
+        event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        stream.waker = lambda: loop.call_soon_threadsafe(event.set)
 
-        # Clean jobs (if task timeout, for instance).
-        executor.shutdown(wait=False)
+        steps = run_task(request, task_hash, stream)
 
-        # Assemble ordered results in chunks.
-        chunks = []
+        try:
+            for step in steps:
+                if isinstance(step, TaskResult):
+                    if screenshots_pending(step.result):
+                        with metrics.phase("screenshot_encode", request):
+                            step.result = await screenshot_encoder.encode_async(request, task_hash, step.result)
 
-        if len(results) > 0:
-            for order in range(jobs_amount):
-                for chunk in results[order]:
-                    chunks.append(chunk)
+                    data = await loop.run_in_executor(None, result_data, request, task_hash, step)
 
-        logger.info("[{}][{}] Task completed. Total: chunks: {}.".format(request.client_id, task_hash, len(chunks)))
+                    for chunk in data_chunks(data, request.chunk_size, request.compression):
+                        yield chunk
+                    continue
 
-        # # Explicitly free and clean resources.
-        # gc.collect()
+                if isinstance(step, webchela_pb2.Chunk):
+                    yield step
+                    continue
 
-        # Return ordered data to client.
-        for chunk in chunks:
-            yield chunk
+                try:
+                    await asyncio.wait_for(event.wait(), step)
+                except asyncio.TimeoutError:
+                    pass
+
+                event.clear()
+
+        finally:
+            steps.close()
+
+
+async def serve_async():
+    # Tasks cost coroutines instead of worker threads, browsers run in scheduler threads (see server.slots).
+    server = grpc.aio.server(compression=GRPC_COMPRESSIONS[config.params.server.grpc_compression])
+    webchela_pb2_grpc.add_ServerServicer_to_server(AsyncServer(), server)
+    server.add_insecure_port(config.params.server.listen)
+
+    await server.start()
+    await server.wait_for_termination()
 
 
 def main():
@@ -287,7 +541,15 @@ def main():
     signal.signal(signal.SIGINT, exit_handler)
 
     try:
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=config.params.server.workers))
+        if config.params.server.metrics_listen:
+            metrics.serve(config.params.server.metrics_listen)
+
+        if config.params.server.mode == "asyncio":
+            asyncio.run(serve_async())
+            return
+
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=config.params.server.workers),
+                             compression=GRPC_COMPRESSIONS[config.params.server.grpc_compression])
         webchela_pb2_grpc.add_ServerServicer_to_server(Server(), server)
         server.add_insecure_port(config.params.server.listen)
         server.start()